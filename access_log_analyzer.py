@@ -0,0 +1,293 @@
+"""Summarize the API's JSONL access log per endpoint.
+
+Reads access.log.jsonl (and, with --rotated, its .1 .. .N backups oldest
+first) one line at a time, so memory stays constant however large the logs
+are. Latency percentiles come from fixed log-scale buckets per endpoint.
+With --db the records are also loaded into an indexed SQLite table
+(access_log) plus an endpoint_summary table, for ad-hoc SQL afterwards.
+Loads remember how far they read each file (by inode and byte offset, so
+rotation is followed), and the next load picks up exactly where the last
+one stopped, whatever order the workers' records were flushed in.
+
+    python access_log_analyzer.py access.log.jsonl --rotated
+    python access_log_analyzer.py access.log.jsonl --db access_log.db --json
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sqlite3
+import sys
+
+# Latency histogram: bucket i holds durations up to BUCKET_BASE_MS * BUCKET_GROWTH ** i
+BUCKET_BASE_MS = 0.05
+BUCKET_GROWTH = 1.2
+BUCKET_COUNT = 80  # up to ~100 s
+LOAD_BATCH_SIZE = 5000
+
+ACCESS_LOG_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS access_log (
+        ts REAL NOT NULL, method TEXT, route TEXT, path TEXT, status INTEGER,
+        duration_ms REAL, bytes INTEGER, client TEXT, pid INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_access_log_ts ON access_log (ts)",
+    "CREATE INDEX IF NOT EXISTS ix_access_log_route_ts ON access_log (route, ts)",
+    "CREATE INDEX IF NOT EXISTS ix_access_log_status ON access_log (status)",
+    """CREATE TABLE IF NOT EXISTS endpoint_summary (
+        method TEXT, route TEXT, requests INTEGER, errors_4xx INTEGER, errors_5xx INTEGER,
+        mean_ms REAL, p50_ms REAL, p95_ms REAL, p99_ms REAL, max_ms REAL, rps REAL, bytes INTEGER,
+        first_ts REAL, last_ts REAL, PRIMARY KEY (method, route)
+    )""",
+    # How far each log file (by inode) has been loaded
+    """CREATE TABLE IF NOT EXISTS ingest_state (
+        inode INTEGER PRIMARY KEY, path TEXT NOT NULL, offset INTEGER NOT NULL
+    )""",
+]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors_4xx = 0
+        self.errors_5xx = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.buckets = [0] * (BUCKET_COUNT + 1)
+
+    def add(self, record):
+        duration = float(record.get("duration_ms") or 0.0)
+        status = int(record.get("status") or 0)
+        ts = record.get("ts")
+        self.count += 1
+        self.total_ms += duration
+        self.max_ms = max(self.max_ms, duration)
+        self.bytes += int(record.get("bytes") or 0)
+        if 400 <= status < 500:
+            self.errors_4xx += 1
+        elif status >= 500:
+            self.errors_5xx += 1
+        if ts is not None:
+            self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+            self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.buckets[_bucket(duration)] += 1
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile (capped at the max seen)."""
+        if not self.count:
+            return None
+        target = math.ceil(pct / 100 * self.count)
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(BUCKET_BASE_MS * BUCKET_GROWTH ** i, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        span = (self.last_ts - self.first_ts) if self.first_ts is not None else 0
+        return {
+            'requests': self.count,
+            'errors_4xx': self.errors_4xx,
+            'errors_5xx': self.errors_5xx,
+            'mean_ms': self.total_ms / self.count if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+            'rps': self.count / span if span > 0 else None,
+            'bytes': self.bytes,
+            'first_ts': self.first_ts,
+            'last_ts': self.last_ts,
+        }
+
+
+def _bucket(duration_ms):
+    if duration_ms <= BUCKET_BASE_MS:
+        return 0
+    return min(BUCKET_COUNT, math.ceil(math.log(duration_ms / BUCKET_BASE_MS, BUCKET_GROWTH)))
+
+
+def log_files(path, rotated=False):
+    """The log and, with `rotated`, its numbered backups, oldest first."""
+    if not rotated:
+        return [path]
+    backups = [p for p in glob.glob(glob.escape(path) + '.*') if p.rsplit('.', 1)[1].isdigit()]
+    backups.sort(key=lambda p: int(p.rsplit('.', 1)[1]), reverse=True)
+    return backups + [path]
+
+
+def iter_records(paths, bad_lines, positions=None):
+    """Yield one dict per valid JSONL line; `bad_lines` is a one-item list counting the rest.
+
+    With `positions` (inode -> (path, byte offset)), each file is read from
+    its offset and its entry advanced past every complete line; a trailing
+    line without a newline is left for the next run. Once all files are
+    read, inodes that were not among them (rotated out) are dropped.
+    """
+    opened = set()
+    for path in paths:
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            inode = stat.st_ino
+            opened.add(inode)
+            pos = positions.get(inode, (path, 0))[1] if positions is not None else 0
+            if pos > stat.st_size:
+                pos = 0  # a new file that reused the inode
+            f.seek(pos)
+            if positions is not None:
+                positions[inode] = (path, pos)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # still being written
+                pos += len(raw)
+                if positions is not None:
+                    positions[inode] = (path, pos)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    bad_lines[0] += 1  # e.g. a line cut off by a crash
+                    continue
+                if isinstance(record, dict):
+                    yield record
+                else:
+                    bad_lines[0] += 1
+    if positions is not None:
+        for inode in set(positions) - opened:
+            del positions[inode]
+
+
+def analyze(records, conn=None):
+    """Aggregate records per (method, route), loading them into `conn` on the way."""
+    endpoints = {}
+    batch = []
+    loaded = 0
+    for record in records:
+        ts = record.get("ts")
+        key = (record.get("method"), record.get("route"))
+        stats = endpoints.get(key)
+        if stats is None:
+            stats = endpoints[key] = EndpointStats()
+        stats.add(record)
+        if conn is not None:
+            batch.append((ts, record.get("method"), record.get("route"), record.get("path"),
+                          record.get("status"), record.get("duration_ms"), record.get("bytes"),
+                          record.get("client"), record.get("pid")))
+            if len(batch) >= LOAD_BATCH_SIZE:
+                loaded += _insert(conn, batch)
+                batch = []
+    if conn is not None and batch:
+        loaded += _insert(conn, batch)
+    return endpoints, loaded
+
+
+def _insert(conn, batch):
+    conn.executemany("INSERT INTO access_log VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    return len(batch)
+
+
+def open_database(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in ACCESS_LOG_SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def load_positions(conn):
+    return {inode: (path, offset) for inode, path, offset in conn.execute("SELECT inode, path, offset FROM ingest_state")}
+
+
+def save_positions(conn, positions):
+    conn.execute("DELETE FROM ingest_state")
+    conn.executemany("INSERT INTO ingest_state VALUES (?, ?, ?)",
+                     [(inode, path, offset) for inode, (path, offset) in positions.items()])
+
+
+def write_summary(conn):
+    """Rebuild endpoint_summary from everything in access_log."""
+    endpoints = {}
+    cursor = conn.execute("SELECT method, route, status, duration_ms, bytes, ts FROM access_log")
+    while True:
+        rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+        if not rows:
+            break
+        for method, route, status, duration_ms, size, ts in rows:
+            stats = endpoints.get((method, route))
+            if stats is None:
+                stats = endpoints[(method, route)] = EndpointStats()
+            stats.add({"status": status, "duration_ms": duration_ms, "bytes": size, "ts": ts})
+    conn.execute("DELETE FROM endpoint_summary")
+    for (method, route), stats in endpoints.items():
+        s = stats.summary()
+        conn.execute(
+            "INSERT INTO endpoint_summary VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (method, route, s['requests'], s['errors_4xx'], s['errors_5xx'], s['mean_ms'], s['p50_ms'],
+             s['p95_ms'], s['p99_ms'], s['max_ms'], s['rps'], s['bytes'], s['first_ts'], s['last_ts']),
+        )
+    return endpoints
+
+
+def print_table(endpoints, out=sys.stdout):
+    print(f"{'method':<7} {'route':<32} {'reqs':>8} {'4xx':>6} {'5xx':>6} {'mean ms':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rps':>8}", file=out)
+    ordered = sorted(endpoints.items(), key=lambda item: item[1].count, reverse=True)
+    for (method, route), stats in ordered:
+        s = stats.summary()
+        rps = f"{s['rps']:.1f}" if s['rps'] is not None else '-'
+        print(f"{method or '-':<7} {route or '-':<32} {s['requests']:>8} {s['errors_4xx']:>6} {s['errors_5xx']:>6} "
+              f"{s['mean_ms']:>9.2f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {rps:>8}", file=out)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the API access log per endpoint")
+    parser.add_argument('log', nargs='?', default='access.log.jsonl', help="JSONL access log")
+    parser.add_argument('--rotated', action='store_true', help="also read the rotated .1 .. .N backups")
+    parser.add_argument('--db', help="load new records into this SQLite database (access_log table); "
+                                     "always reads the rotated backups too")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    bad_lines = [0]
+    # A load must see lines that were rotated away since the last one
+    paths = log_files(args.log, args.rotated or bool(args.db))
+
+    conn = None
+    positions = None
+    if args.db:
+        conn = open_database(args.db)
+        positions = load_positions(conn)
+    try:
+        endpoints, loaded = analyze(iter_records(paths, bad_lines, positions), conn)
+        if conn is not None:
+            save_positions(conn, positions)
+            # The summary covers every load, not just this run's records
+            endpoints = write_summary(conn)
+            conn.commit()
+    finally:
+        if conn is not None:
+            conn.close()
+
+    if args.json:
+        summary = [{'method': method, 'route': route, **stats.summary()}
+                   for (method, route), stats in endpoints.items()]
+        print(json.dumps({'endpoints': summary, 'bad_lines': bad_lines[0], 'loaded': loaded}, indent=2))
+    else:
+        print_table(endpoints)
+        if args.db:
+            print(f"\nLoaded {loaded} new records into {args.db}")
+        if bad_lines[0]:
+            print(f"Skipped {bad_lines[0]} malformed lines", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Access log settings (override with environment variables; empty path disables)
+ACCESS_LOG_PATH = os.environ.get('ACCESS_LOG_PATH', 'access.log.jsonl')
+ACCESS_LOG_MAX_BYTES = int(os.environ.get('ACCESS_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+ACCESS_LOG_BACKUPS = int(os.environ.get('ACCESS_LOG_BACKUPS', '5'))
+ACCESS_LOG_FLUSH_INTERVAL = float(os.environ.get('ACCESS_LOG_FLUSH_INTERVAL', '1.0'))
+# Records held in memory before new ones are dropped (the request never waits)
+ACCESS_LOG_MAX_QUEUE = int(os.environ.get('ACCESS_LOG_MAX_QUEUE', '100000'))
+
+
+class AccessLogWriter:
+    """Buffered JSONL access log written from a background thread.
+
+    `record()` only appends to an in-memory deque. The writer thread flushes
+    every `flush_interval` seconds with one write() per batch, rotating to
+    `path.1` .. `path.<backups>` once the file would pass `max_bytes`.
+    Flushes and rotation hold an flock on `path.lock`, so several worker
+    processes can share one log.
+    """
+
+    def __init__(self, path=ACCESS_LOG_PATH, max_bytes=ACCESS_LOG_MAX_BYTES, backups=ACCESS_LOG_BACKUPS,
+                 flush_interval=ACCESS_LOG_FLUSH_INTERVAL, max_queue=ACCESS_LOG_MAX_QUEUE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.written = 0
+        self._records = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._worker = None
+
+    def record(self, entry):
+        if len(self._records) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._records.append(entry)
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='access-log', daemon=True)
+                    self._worker.start()
+
+    def flush(self):
+        entries = []
+        while self._records:
+            entries.append(self._records.popleft())
+        if not entries:
+            return 0
+        data = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries).encode('utf-8')
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+                if size and size + len(data) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, 'ab') as f:
+                    f.write(data)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.written += len(entries)
+        return len(entries)
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        self.flush()
+
+    def stats(self):
+        return {'queued': len(self._records), 'written': self.written, 'dropped': self.dropped}
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f'{self.path}.{i}'
+            if os.path.exists(src):
+                os.replace(src, f'{self.path}.{i + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass  # disk full or similar; the next flush tries again with newer records
+
+
+class AccessLogMiddleware:
+    """ASGI middleware that hands one record per HTTP request to an AccessLogWriter."""
+
+    def __init__(self, app, writer):
+        self.app = app
+        self.writer = writer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        response = {"status": 500, "bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            client = scope.get("client")
+            self.writer.record({
+                "ts": time.time(),
+                "method": scope["method"],
+                "route": getattr(route, "path", "unmatched"),
+                "path": scope["path"],
+                "status": response["status"],
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "bytes": response["bytes"],
+                "client": client[0] if client else None,
+                "pid": os.getpid(),
+            })
@@ -0,0 +1,80 @@
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+
+from api.db import SQLITE_BUSY_TIMEOUT_MS, SQLITE_MAX_OVERFLOW, SQLITE_POOL_SIZE, apply_pragmas
+
+
+def create_async_sqlite_engine(db_path):
+    """Async (aiosqlite) counterpart of create_sqlite_engine with the same PRAGMAs."""
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{db_path}',
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=SQLITE_MAX_OVERFLOW,
+        connect_args={'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection)
+
+    return engine
+
+
+class AsyncWriter:
+    """Runs every write on a single task so SQLite only ever sees one writer.
+
+    `submit(operation)` queues `operation(session)`, commits its session and
+    returns the operation's result (or raises its exception) to the caller.
+    `lock` (a WriteLock) is held from before the operation until its commit.
+    """
+
+    def __init__(self, sessionmaker, lock=None):
+        self._sessionmaker = sessionmaker
+        self._lock = lock
+        self._queue = None
+        self._task = None
+
+    async def submit(self, operation, after_commit=None):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, after_commit, future))
+        return await future
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            operation, after_commit, future = item
+            try:
+                if self._lock is not None:
+                    await run_in_threadpool(self._lock.acquire)
+                try:
+                    async with self._sessionmaker() as session:
+                        result = await operation(session)
+                        await session.commit()
+                finally:
+                    if self._lock is not None:
+                        self._lock.release()
+                # Runs in commit order, before the next write starts
+                if after_commit is not None:
+                    await run_in_threadpool(after_commit, result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
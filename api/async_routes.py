@@ -0,0 +1,122 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from api.async_db import AsyncWriter, create_async_sqlite_engine
+from api.cache import etag_matches, make_etag
+from api.fast_json import FastJSONResponse, dumps, user_dict
+from api.metrics import db_rows_returned, instrument_engine
+from api.models import USERS_PAGE_DEFAULT_LIMIT, USERS_PAGE_MAX_LIMIT, User, UserDB, UserPage
+
+
+def create_async_router(db_path, record_changes, user_cache, write_lock=None, follow_changes=None):
+    """Build the /async router: async handlers over an aiosqlite AsyncEngine.
+
+    Reads use a session injected per request; writes go through one
+    AsyncWriter task and are passed to `record_changes` in commit order.
+    `user_cache` is the same read-through cache the sync get_user uses,
+    `write_lock` the lock the sync write paths take, and `follow_changes`
+    the hook get_user calls first to see other workers' writes.
+    """
+    engine = create_async_sqlite_engine(db_path)
+    instrument_engine(engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    writer = AsyncWriter(AsyncSessionLocal, lock=write_lock)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await writer.close()
+        await engine.dispose()
+
+    router = APIRouter(prefix="/async", tags=["async"], lifespan=lifespan)
+
+    async def get_session():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    # Get a page of users as JSON
+    @router.get("/users", response_model=UserPage)
+    async def get_users(after_id: int = 0,
+                        limit: int = Query(USERS_PAGE_DEFAULT_LIMIT, ge=1, le=USERS_PAGE_MAX_LIMIT),
+                        session: AsyncSession = Depends(get_session)):
+        result = await session.execute(
+            select(UserDB.id, UserDB.name, UserDB.age)
+            .where(UserDB.id > after_id)
+            .order_by(UserDB.id)
+            .limit(limit)
+        )
+        rows = result.all()
+        db_rows_returned.observe(len(rows), route="/async/users")
+        return UserPage(
+            users=[User(id=row.id, name=row.name, age=row.age) for row in rows],
+            next_after_id=rows[-1].id if len(rows) == limit else None,
+        )
+
+    # Get a specific user by ID
+    @router.get("/users/{user_id}", response_model=User)
+    async def get_user(user_id: int, if_none_match: Optional[str] = Header(None),
+                       session: AsyncSession = Depends(get_session)):
+        if follow_changes is not None:
+            follow_changes()  # one PRAGMA when idle, same as the sync get_user
+        cached = user_cache.get(user_id)
+        if cached is None:
+            generation = user_cache.generation
+            result = await session.execute(
+                select(UserDB.id, UserDB.name, UserDB.age).where(UserDB.id == user_id)
+            )
+            row = result.first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            cached = (dumps(user_dict(row)), make_etag(*row))
+            user_cache.set(user_id, cached, generation)
+
+        body, etag = cached
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return FastJSONResponse(body, headers={"ETag": etag})
+
+    # Create a new user
+    @router.post("/users/", response_model=User)
+    async def create_user(user: User):
+        async def insert_user(session):
+            db_user = UserDB(name=user.name, age=user.age)
+            session.add(db_user)
+            await session.flush()
+            return {"id": db_user.id, "name": db_user.name, "age": db_user.age}
+
+        row = await writer.submit(insert_user, lambda row: record_changes([("insert", row)]))
+        user.id = row["id"]
+        return user
+
+    # Update a user
+    @router.put("/users/{user_id}", response_model=User)
+    async def update_user(user_id: int, updated_user: User):
+        async def update_row(session):
+            user = await session.get(UserDB, user_id)
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            user.name = updated_user.name
+            user.age = updated_user.age
+            return {"id": user_id, "name": updated_user.name, "age": updated_user.age}
+
+        await writer.submit(update_row, lambda row: record_changes([("put", row)]))
+        return updated_user
+
+    # Delete a user
+    @router.delete("/users/{user_id}")
+    async def delete_user(user_id: int):
+        async def delete_row(session):
+            user = await session.get(UserDB, user_id)
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            await session.delete(user)
+            return {"id": user_id}
+
+        await writer.submit(delete_row, lambda row: record_changes([("del", row)]))
+        return {"message": f"User {user_id} deleted"}
+
+    return router
@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+import os
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from api.models import users_table
+
+# Rows per executemany call inside a bulk transaction
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '5000'))
+
+
+class BulkUser(BaseModel):
+    name: str
+    age: int
+
+
+class BulkUserUpdate(BaseModel):
+    id: int
+    name: str
+    age: int
+
+
+class BulkResult(BaseModel):
+    processed: int = 0
+    succeeded: int = 0
+    errors: list = []
+
+
+class _BadRecord:
+    # Stands in for an input record that could not be parsed; reported by _validate
+    def __init__(self, error):
+        self.error = error
+
+
+def iter_records(fileobj, fmt):
+    """Yield raw records from a binary file in 'json', 'ndjson' or 'csv' format.
+
+    A malformed NDJSON line does not stop the import; it is reported as an
+    error at its index like a record that fails validation.
+    """
+    if fmt == 'json':
+        records = json.load(fileobj)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of users")
+        yield from records
+    elif fmt == 'ndjson':
+        for line in fileobj:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield _BadRecord(f"Invalid JSON: {e}")
+    elif fmt == 'csv':
+        text_file = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+        try:
+            yield from csv.DictReader(text_file)
+        finally:
+            text_file.detach()
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _validate(records, model, result):
+    for index, record in enumerate(records):
+        result.processed += 1
+        if isinstance(record, _BadRecord):
+            result.errors.append({"index": index, "error": record.error})
+            continue
+        try:
+            yield model.model_validate(record)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = '.'.join(str(part) for part in error['loc'])
+            result.errors.append({"index": index, "error": f"{field}: {error['msg']}"})
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(engine, records, on_change=None, batch_size=BULK_BATCH_SIZE):
+    """Validate and insert records in one transaction, `batch_size` rows per executemany.
+
+    Invalid records are skipped and reported by their position in the input.
+    After the commit, `on_change` receives the list of ('insert', row) changes.
+    """
+    result = BulkResult()
+    changes = []
+    users = _validate(records, BulkUser, result)
+    stmt = insert(users_table).returning(users_table.c.id, users_table.c.name, users_table.c.age)
+    with engine.begin() as conn:
+        for batch in _batches(users, batch_size):
+            rows = conn.execute(stmt, [user.model_dump() for user in batch]).all()
+            result.succeeded += len(rows)
+            changes.extend(('insert', row._asdict()) for row in rows)
+    if on_change is not None:
+        on_change(changes)
+    return result
+
+
+def bulk_update(engine, records, on_change=None, batch_size=BULK_BATCH_SIZE):
+    """Update users by id in one transaction; unknown ids are reported as errors."""
+    result = BulkResult()
+    changes = []
+    users = _validate(records, BulkUserUpdate, result)
+    stmt = (
+        update(users_table)
+        .where(users_table.c.id == bindparam('b_id'))
+        .values(name=bindparam('b_name'), age=bindparam('b_age'))
+    )
+    with engine.begin() as conn:
+        for batch in _batches(users, batch_size):
+            ids = [user.id for user in batch]
+            existing = set(conn.scalars(select(users_table.c.id).where(users_table.c.id.in_(ids))))
+            found = [user for user in batch if user.id in existing]
+            for user in batch:
+                if user.id not in existing:
+                    result.errors.append({"id": user.id, "error": "User not found"})
+            if found:
+                conn.execute(stmt, [{"b_id": u.id, "b_name": u.name, "b_age": u.age} for u in found])
+                result.succeeded += len(found)
+                changes.extend(('put', user.model_dump()) for user in found)
+    if on_change is not None:
+        on_change(changes)
+    return result
+
+
+def bulk_delete(engine, ids, on_change=None, batch_size=BULK_BATCH_SIZE):
+    """Delete users by id in one transaction; unknown ids are reported as errors."""
+    result = BulkResult()
+    changes = []
+    stmt = delete(users_table).where(users_table.c.id.in_(bindparam('ids', expanding=True)))
+    with engine.begin() as conn:
+        for batch in _batches(ids, batch_size):
+            result.processed += len(batch)
+            deleted = set(conn.scalars(stmt.returning(users_table.c.id), {"ids": batch}))
+            for user_id in batch:
+                if user_id not in deleted:
+                    result.errors.append({"id": user_id, "error": "User not found"})
+            result.succeeded += len(deleted)
+            changes.extend(('del', {"id": user_id}) for user_id in deleted)
+    if on_change is not None:
+        on_change(changes)
+    return result
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+# Seconds between polls of user_changes for /changes/stream
+CHANGE_FEED_POLL_INTERVAL = float(os.environ.get('CHANGE_FEED_POLL_INTERVAL', '0.5'))
+# Seconds between keep-alive comments on an idle stream
+CHANGE_FEED_HEARTBEAT = float(os.environ.get('CHANGE_FEED_HEARTBEAT', '15'))
+# Rows kept in user_changes by pruning (0 keeps everything)
+CHANGE_LOG_MAX_ROWS = int(os.environ.get('CHANGE_LOG_MAX_ROWS', '1000000'))
+# Seconds between prunes while the app runs
+CHANGE_LOG_PRUNE_INTERVAL = float(os.environ.get('CHANGE_LOG_PRUNE_INTERVAL', '60'))
+# Milliseconds between ChangeFollower polls
+CHANGE_FOLLOW_INTERVAL_MS = float(os.environ.get('CHANGE_FOLLOW_INTERVAL_MS', '100'))
+
+logger = logging.getLogger("api.changes")
+
+# user_changes ops as record_user_changes names them
+_CHANGE_OPS = {'insert': 'insert', 'update': 'put', 'delete': 'del'}
+
+# AUTOINCREMENT so sequence numbers are never reused, even after pruning
+CHANGES_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS user_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        name TEXT,
+        age INTEGER,
+        changed_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_insert AFTER INSERT ON users BEGIN
+        INSERT INTO user_changes (op, user_id, name, age) VALUES ('insert', new.id, new.name, new.age);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_update AFTER UPDATE ON users BEGIN
+        INSERT INTO user_changes (op, user_id, name, age) VALUES ('update', new.id, new.name, new.age);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_delete AFTER DELETE ON users BEGIN
+        INSERT INTO user_changes (op, user_id) VALUES ('delete', old.id);
+    END""",
+]
+
+
+class Change(BaseModel):
+    seq: int
+    op: str
+    id: int
+    name: Optional[str] = None
+    age: Optional[int] = None
+    changed_at: float
+
+
+class ChangePage(BaseModel):
+    changes: List[Change]
+    # Pass as ?since= on the next call
+    last_seq: int
+    has_more: bool
+
+
+def ensure_changes_schema(engine):
+    """Create the user_changes log and the triggers that fill it."""
+    with engine.begin() as conn:
+        for statement in CHANGES_SCHEMA:
+            conn.exec_driver_sql(statement)
+
+
+def prune_changes(engine, max_rows=CHANGE_LOG_MAX_ROWS):
+    """Delete all but the newest `max_rows` changes; returns the number deleted."""
+    if not max_rows or _excess_changes(engine, max_rows) <= 0:
+        return 0
+    with engine.begin() as conn:
+        result = conn.execute(
+            text("DELETE FROM user_changes WHERE seq <= (SELECT MAX(seq) FROM user_changes) - :keep"),
+            {"keep": max_rows},
+        )
+        return result.rowcount
+
+
+def _excess_changes(engine, max_rows):
+    with engine.connect() as conn:
+        first, last = conn.execute(text("SELECT MIN(seq), MAX(seq) FROM user_changes")).one()
+    # Only the oldest entries are ever deleted, so seqs in the log are contiguous
+    return 0 if first is None else last - first + 1 - max_rows
+
+
+def change_bounds(engine):
+    """Return (oldest retained seq, newest seq); (None, 0) for an empty log."""
+    with engine.connect() as conn:
+        first, last = conn.execute(text("SELECT MIN(seq), MAX(seq) FROM user_changes")).one()
+        if last is None:
+            # An emptied log still remembers its last seq in sqlite_sequence
+            last = conn.execute(
+                text("SELECT seq FROM sqlite_sequence WHERE name = 'user_changes'")
+            ).scalar() or 0
+    return first, last
+
+
+def fetch_changes(engine, since, limit):
+    """Changes with seq > since, oldest first, as a ChangePage."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT seq, op, user_id, name, age, changed_at FROM user_changes "
+                 "WHERE seq > :since ORDER BY seq LIMIT :limit"),
+            {"since": since, "limit": limit + 1},
+        ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = [Change(seq=row.seq, op=row.op, id=row.user_id, name=row.name, age=row.age,
+                      changed_at=row.changed_at) for row in rows]
+    return ChangePage(changes=changes, last_seq=rows[-1].seq if rows else since, has_more=has_more)
+
+
+async def iter_change_events(engine, request, since, batch_size=1000):
+    """Server-sent events for every change after `since`, until the client leaves.
+
+    Each event's id is its seq, so a reconnecting EventSource resumes from
+    Last-Event-ID without gaps.
+    """
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        page = await run_in_threadpool(fetch_changes, engine, since, batch_size)
+        if page.changes:
+            lines = []
+            for change in page.changes:
+                lines.append(f"id: {change.seq}\nevent: change\ndata: {json.dumps(change.model_dump())}\n\n")
+            since = page.last_seq
+            last_sent = time.monotonic()
+            yield "".join(lines)
+            if page.has_more:
+                continue
+        elif time.monotonic() - last_sent >= CHANGE_FEED_HEARTBEAT:
+            last_sent = time.monotonic()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(CHANGE_FEED_POLL_INTERVAL)
+
+
+class ChangeFollower:
+    """Tails user_changes so a process sees writes committed by other processes.
+
+    `poll()` costs one `PRAGMA data_version` when nothing was committed;
+    otherwise it reads the new log entries and passes them to the callback as
+    ('insert' | 'put' | 'del', row) changes, the shape record_user_changes
+    takes. `start()` also polls from a background thread every `interval_ms`.
+
+    The callback runs outside the follower's lock, so it must not care about
+    order (cache invalidation). Slow or order-sensitive work goes to `apply`,
+    which gets `(changes, seq)` in log order on the background thread only,
+    so a request that polls inline never waits for it.
+    """
+
+    def __init__(self, db_path, batch_size=1000, interval_ms=CHANGE_FOLLOW_INTERVAL_MS):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.callback = None
+        self.apply = None
+        self.seq = 0
+        # (changes, seq) batches read by any poll, waiting for `apply`
+        self._backlog = deque()
+        self._conn = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, callback, since=None, apply=None):
+        """Follow from `since`, or the current end of the log (call after migrations)."""
+        self.callback = callback
+        self.apply = apply
+        self._conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+        if since is None:
+            since = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), (SELECT seq FROM sqlite_sequence WHERE name = 'user_changes'), 0) "
+                "FROM user_changes"
+            ).fetchone()[0]
+        self.seq = since
+        # None makes the first poll read the log, covering writes since `since`
+        self._version = None
+        self._thread = threading.Thread(target=self._run, name='change-follower', daemon=True)
+        self._thread.start()
+
+    def poll(self):
+        batches = []
+        with self._lock:
+            if self._conn is None:
+                return 0
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._version:
+                return 0
+            self._version = version
+            while True:
+                rows = self._conn.execute(
+                    "SELECT seq, op, user_id, name, age FROM user_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (self.seq, self.batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                self.seq = rows[-1][0]
+                changes = [(_CHANGE_OPS[op], {"id": user_id, "name": name, "age": age})
+                           for _, op, user_id, name, age in rows]
+                batches.append(changes)
+                if self.apply is not None:
+                    self._backlog.append((changes, self.seq))
+                if len(rows) < self.batch_size:
+                    break
+        for changes in batches:
+            self.callback(changes)
+        return sum(len(changes) for changes in batches)
+
+    def drain(self):
+        """Pass queued batches to `apply`; only the background thread (or close) calls this."""
+        while self._backlog:
+            changes, seq = self._backlog.popleft()
+            self.apply(changes, seq)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            # Pick up writes made since the last tick, so nothing waits for the next startup
+            try:
+                self.poll()
+            except sqlite3.Error:
+                pass
+            if self.apply is not None:
+                self.drain()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except sqlite3.Error:
+                pass  # e.g. briefly locked during a checkpoint; retried next tick
+            try:
+                self.drain()
+            except Exception:
+                # The stored seq stays behind, so the next startup replays these changes
+                logger.exception("Applying followed changes failed")
+
+
+class ChangeLogPruner:
+    """Background thread that keeps user_changes at CHANGE_LOG_MAX_ROWS.
+
+    Every write adds a log entry (each row of a bulk import too), so pruning
+    only at startup would let the log grow for as long as the process runs.
+    `lock`, if given, is held around each delete.
+    """
+
+    def __init__(self, engine, lock=None, interval=CHANGE_LOG_PRUNE_INTERVAL, max_rows=CHANGE_LOG_MAX_ROWS):
+        self.engine = engine
+        self.lock = lock
+        self.interval = interval
+        self.max_rows = max_rows
+        self.pruned = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not self.max_rows or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name='change-log-pruner', daemon=True)
+        self._thread.start()
+
+    def prune(self):
+        # Checked before taking the lock, so idle ticks never hold up writers
+        if _excess_changes(self.engine, self.max_rows) <= 0:
+            return 0
+        with self.lock or nullcontext():
+            deleted = prune_changes(self.engine, self.max_rows)
+        self.pruned += deleted
+        return deleted
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.prune()
+            except Exception:
+                logger.exception("Pruning user_changes failed")
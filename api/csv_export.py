@@ -0,0 +1,157 @@
+import csv
+import io
+import os
+import re
+import time
+import zlib
+
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import text
+
+from api.metrics import csv_export_duration
+
+# Rows fetched from the cursor per CSV chunk
+CSV_EXPORT_BATCH_SIZE = int(os.environ.get('CSV_EXPORT_BATCH_SIZE', '5000'))
+# Most bytes one Range request returns (they are buffered to know the real end)
+CSV_RANGE_MAX_BYTES = int(os.environ.get('CSV_RANGE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+CSV_COLUMNS = ['id', 'name', 'age']
+
+_RANGE_RE = re.compile(r'^bytes=(\d+)-(\d*)$')
+
+
+def iter_csv(engine, after_id=None, batch_size=CSV_EXPORT_BATCH_SIZE, with_version=False):
+    """Yield the users table as CSV bytes, one `fetchmany` batch at a time.
+
+    Rows come out in id order, so a download that broke off can be resumed
+    with `after_id` set to the last complete id the client received.
+    With `with_version` the first item is the user_changes seq the rows are
+    current with (None when there is no change log), read in the same
+    transaction as the rows.
+    """
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        if with_version:
+            # pysqlite does not BEGIN before a SELECT; one read transaction pins the version to the rows
+            conn.exec_driver_sql("BEGIN")
+            yield _table_version(conn)
+        result = conn.execution_options(stream_results=True).execute(
+            text("SELECT id, name, age FROM users WHERE id > :after_id ORDER BY id"),
+            {"after_id": -1 if after_id is None else after_id},
+        )
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator='\n')
+        if after_id is None:
+            writer.writerow(CSV_COLUMNS)
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode('utf-8')
+    csv_export_duration.observe(time.perf_counter() - start, kind="download")
+
+
+def _table_version(conn):
+    has_log = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_changes'"
+    ).first()
+    if has_log is None:
+        return None
+    return conn.exec_driver_sql(
+        "SELECT COALESCE(MAX(seq), (SELECT seq FROM sqlite_sequence WHERE name = 'user_changes'), 0) "
+        "FROM user_changes"
+    ).scalar()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def read_range(chunks, start, end):
+    """Collect bytes start..end (inclusive) of the stream.
+
+    Returns (data, total), where total is the stream's full length if it
+    ended before `end` was passed, else None.
+    """
+    parts = []
+    pos = 0
+    for chunk in chunks:
+        chunk_end = pos + len(chunk)
+        if chunk_end > start:
+            parts.append(chunk[max(start - pos, 0):end + 1 - pos])
+        pos = chunk_end
+        if pos > end:
+            return b''.join(parts), None
+    return b''.join(parts), pos
+
+
+def parse_range(range_header):
+    """Parse a single `bytes=start-end` or `bytes=start-` range, or return None.
+
+    An open-ended range is read as the next CSV_RANGE_MAX_BYTES from start.
+    """
+    if not range_header:
+        return None
+    match = _RANGE_RE.match(range_header.strip())
+    if match is None:
+        return None
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else start + CSV_RANGE_MAX_BYTES - 1
+    if start > end:
+        raise HTTPException(status_code=416, detail="Invalid range")
+    return start, end
+
+
+def csv_download_response(engine, filename, gzip=False, after_id=None, range_header=None, if_range=None):
+    """Build a StreamingResponse for the users CSV.
+
+    The body is generated from the cursor and never held in memory. Its ETag
+    is the change-log seq it was read at, so a `Range: bytes=a-b` (or
+    `bytes=a-`) request returns 206 with that slice of the (optionally gzipped) stream,
+    up to CSV_RANGE_MAX_BYTES, only while `If-Range` still matches; otherwise
+    the full body is sent. A range past the end gets 416. Without a change
+    log there is no validator, so ranges are not offered and `after_id` is
+    the way to resume.
+    """
+    csv_chunks = iter_csv(engine, after_id=after_id, with_version=True)
+    version = next(csv_chunks)
+    chunks = csv_chunks
+    media_type = 'text/csv'
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        media_type = 'application/gzip'
+        filename += '.gz'
+
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    byte_range = None
+    if version is not None:
+        etag = f'"users-{version}-{"all" if after_id is None else after_id}{"-gz" if gzip else ""}"'
+        headers['ETag'] = etag
+        headers['Accept-Ranges'] = 'bytes'
+        if if_range is None or if_range.strip() == etag:
+            byte_range = parse_range(range_header)
+
+    if byte_range is not None:
+        start, end = byte_range
+        try:
+            data, total = read_range(chunks, start, min(end, start + CSV_RANGE_MAX_BYTES - 1))
+        finally:
+            csv_chunks.close()
+        if not data:
+            headers['Content-Range'] = f'bytes */{total}'
+            return Response(status_code=416, headers=headers)
+        headers['Content-Range'] = f'bytes {start}-{start + len(data) - 1}/{"*" if total is None else total}'
+        return Response(data, status_code=206, media_type=media_type, headers=headers)
+
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -0,0 +1,289 @@
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import text
+
+from api.changes import change_bounds, fetch_changes
+from api.metrics import csv_export_duration
+
+# Mirror settings (override with environment variables)
+CSV_MIRROR_MODE = os.environ.get('CSV_MIRROR_MODE', 'sync')  # 'sync' or 'background'
+CSV_MIRROR_FLUSH_INTERVAL = float(os.environ.get('CSV_MIRROR_FLUSH_INTERVAL', '1.0'))
+CSV_MIRROR_FLUSH_SIZE = int(os.environ.get('CSV_MIRROR_FLUSH_SIZE', '500'))
+CSV_MIRROR_COMPACT_THRESHOLD = int(os.environ.get('CSV_MIRROR_COMPACT_THRESHOLD', '1000'))
+
+CSV_COLUMNS = ['id', 'name', 'age']
+
+logger = logging.getLogger("api.csv_mirror")
+
+
+class CsvMirror:
+    """Keeps users.csv in step with the users table one row at a time.
+
+    Inserts are appended to the CSV. Updates and deletes go to a patch log
+    next to it and are folded into the CSV when the log grows past
+    `compact_threshold` entries (or when `compact()` is called).
+
+    The last user_changes seq applied is kept in `<csv>.seq`, so `ensure()`
+    can catch up on writes made while nothing was mirroring them.
+    """
+
+    def __init__(self, csv_path, mode=CSV_MIRROR_MODE,
+                 flush_interval=CSV_MIRROR_FLUSH_INTERVAL,
+                 flush_size=CSV_MIRROR_FLUSH_SIZE,
+                 compact_threshold=CSV_MIRROR_COMPACT_THRESHOLD):
+        self.csv_path = csv_path
+        self.patch_path = csv_path + '.patch'
+        self.seq_path = csv_path + '.seq'
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.Lock()
+        # id -> row dict ("put") or None ("del"), mirrors the patch log on disk
+        self._pending = {}
+        # Lines in the patch log; several can be for the same id
+        self._patch_entries = 0
+        self._load_patch_log()
+
+        self._queue = None
+        self._worker = None
+        if self.mode == 'background':
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, name='csv-mirror', daemon=True)
+            self._worker.start()
+
+    # Public API, fed from the change log by the worker that owns the CSV
+
+    def record_many(self, changes, seq=None):
+        """Record a list of ('insert' | 'put' | 'del', row) changes in one go.
+
+        `seq` is the user_changes seq of the last change, stored once they are written.
+        """
+        if seq is not None:
+            changes = list(changes) + [('seq', seq)]
+        if self._queue is not None:
+            for change in changes:
+                self._queue.put(change)
+        elif changes:
+            with self._lock:
+                self._apply_locked(changes)
+
+    def flush(self):
+        """Block until every queued change has been written (background mode)."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def compact(self):
+        """Fold the patch log into the CSV with a single streaming rewrite."""
+        self.flush()
+        with self._lock:
+            self._compact_locked()
+
+    def rebuild(self, engine):
+        """Rewrite the CSV from the database and drop any pending patches.
+
+        Returns the user_changes seq the new CSV is current with.
+        """
+        self.flush()
+        with self._lock:
+            # Read before the rows: a write in between is replayed by catch-up, not lost
+            _, seq = change_bounds(engine)
+            tmp_path = self.csv_path + '.tmp'
+            with engine.connect() as conn, open(tmp_path, 'w', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(CSV_COLUMNS)
+                result = conn.execute(text("SELECT id, name, age FROM users ORDER BY id"))
+                while True:
+                    rows = result.fetchmany(1000)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+            os.replace(tmp_path, self.csv_path)
+            self._pending = {}
+            self._patch_entries = 0
+            if os.path.exists(self.patch_path):
+                os.remove(self.patch_path)
+            self._write_seq(seq)
+        return seq
+
+    def ensure(self, engine, batch_size=1000):
+        """Bring the CSV up to date with the database and return the seq it is current with.
+
+        Changes logged since the stored seq are replayed as upserts and
+        deletes, which is safe even for changes already applied. The CSV is
+        rebuilt first if it is missing, has no seq, or the changes it needs
+        were pruned from the log.
+        """
+        seq = self._read_seq()
+        first, last = change_bounds(engine)
+        oldest = first if first is not None else last + 1
+        if not os.path.exists(self.csv_path) or seq is None or seq < oldest - 1 or seq > last:
+            seq = self.rebuild(engine)
+        self.flush()
+        while True:
+            page = fetch_changes(engine, seq, batch_size)
+            if page.changes:
+                changes = [('del' if change.op == 'delete' else 'put',
+                            {'id': change.id, 'name': change.name, 'age': change.age})
+                           for change in page.changes]
+                with self._lock:
+                    self._apply_locked(changes + [('seq', page.last_seq)])
+            seq = page.last_seq
+            if not page.has_more:
+                return seq
+
+    def close(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+            self._queue = None
+
+    # Internals
+
+    def _run(self):
+        while True:
+            change = self._queue.get()
+            if change is None:
+                self._queue.task_done()
+                return
+            batch = [change]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.flush_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    change = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if change is None:
+                    stop = True
+                    break
+                batch.append(change)
+            try:
+                with self._lock:
+                    self._apply_locked(batch)
+            except OSError:
+                logger.exception("Error writing %d changes to the CSV mirror", len(batch))
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _apply_locked(self, changes):
+        start = time.perf_counter()
+        appends = []
+        patches = []
+        seq = None
+        patched_ids = set(self._pending)
+        for op, row in changes:
+            if op == 'seq':
+                seq = row
+                continue
+            # A reused id may still have a patch pending against an old row,
+            # so it has to go through the patch log to stay ordered.
+            if op == 'insert' and row['id'] not in patched_ids:
+                appends.append(row)
+            else:
+                patches.append(('del' if op == 'del' else 'put', row))
+                patched_ids.add(row['id'])
+
+        if appends:
+            new_file = not os.path.exists(self.csv_path)
+            with open(self.csv_path, 'a', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                if new_file:
+                    writer.writerow(CSV_COLUMNS)
+                writer.writerows([row['id'], row['name'], row['age']] for row in appends)
+
+        if patches:
+            with open(self.patch_path, 'a', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                for op, row in patches:
+                    writer.writerow([op, row['id'], row.get('name', ''), row.get('age', '')])
+                    self._pending[row['id']] = row if op == 'put' else None
+            self._patch_entries += len(patches)
+
+        csv_export_duration.observe(time.perf_counter() - start, kind="mirror")
+
+        if self._patch_entries >= self.compact_threshold:
+            self._compact_locked()
+        if seq is not None:
+            self._write_seq(seq)
+
+    def _compact_locked(self):
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        pending = dict(self._pending)
+        tmp_path = self.csv_path + '.tmp'
+        with open(tmp_path, 'w', newline='') as out:
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(CSV_COLUMNS)
+            if os.path.exists(self.csv_path):
+                with open(self.csv_path, newline='') as f:
+                    reader = csv.reader(f)
+                    next(reader, None)
+                    for record in reader:
+                        user_id = int(record[0])
+                        if user_id in pending:
+                            row = pending.pop(user_id)
+                            if row is not None:
+                                writer.writerow([row['id'], row['name'], row['age']])
+                        else:
+                            writer.writerow(record)
+            # Upserts for ids that were not in the CSV yet
+            for row in pending.values():
+                if row is not None:
+                    writer.writerow([row['id'], row['name'], row['age']])
+        os.replace(tmp_path, self.csv_path)
+        self._pending = {}
+        self._patch_entries = 0
+        if os.path.exists(self.patch_path):
+            os.remove(self.patch_path)
+        csv_export_duration.observe(time.perf_counter() - start, kind="compact")
+
+    def _read_seq(self):
+        try:
+            with open(self.seq_path) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _write_seq(self, seq):
+        tmp_path = self.seq_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(f'{seq}\n')
+        os.replace(tmp_path, self.seq_path)
+
+    def _load_patch_log(self):
+        # Bounded by compact_threshold lines, since compaction counts entries
+        if not os.path.exists(self.patch_path):
+            return
+        try:
+            with open(self.patch_path, newline='') as f:
+                for op, user_id, name, age in csv.reader(f):
+                    user_id = int(user_id)
+                    if op == 'put':
+                        self._pending[user_id] = {'id': user_id, 'name': name, 'age': int(age)}
+                    else:
+                        self._pending[user_id] = None
+                    self._patch_entries += 1
+        except ValueError:
+            # e.g. a line cut short by a crash mid-append. Dropping the stamp makes
+            # ensure() rebuild the CSV from the database instead of trusting it.
+            logger.warning("Discarding unreadable %s; %s will be rebuilt", self.patch_path, self.csv_path)
+            self._pending = {}
+            self._patch_entries = 0
+            for path in (self.patch_path, self.seq_path):
+                if os.path.exists(path):
+                    os.remove(path)
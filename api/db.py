@@ -0,0 +1,54 @@
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+# SQLite connection profile (override with environment variables, see start.sh)
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', '-64000'))  # negative = KiB
+SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '5'))
+SQLITE_MAX_OVERFLOW = int(os.environ.get('SQLITE_MAX_OVERFLOW', '10'))
+
+
+def apply_pragmas(dbapi_connection, read_only=False):
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA temp_store={SQLITE_TEMP_STORE}")
+    cursor.close()
+
+
+def create_sqlite_engine(db_path, read_only=False):
+    """Create the shared engine for `db_path` with the tuned connection profile.
+
+    Connections are pooled with QueuePool and may be used from any threadpool
+    worker, and every new connection gets the PRAGMAs above. `read_only`
+    opens the file as a `mode=ro` URI, so those connections can never take
+    the write lock; the database must already exist (and be in WAL mode for
+    readers not to block on writers).
+    """
+    url = f'sqlite:///file:{db_path}?mode=ro&uri=true' if read_only else f'sqlite:///{db_path}'
+    engine = create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=SQLITE_MAX_OVERFLOW,
+        connect_args={
+            'check_same_thread': False,
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
+    )
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, read_only)
+
+    return engine
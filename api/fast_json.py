@@ -0,0 +1,35 @@
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output
+    orjson = None
+
+
+def dumps(content):
+    """Serialize to compact UTF-8 JSON bytes, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def user_dict(row):
+    # row is a plain (id, name, age) tuple from a Core select
+    return {"id": row[0], "name": row[1], "age": row[2]}
+
+
+class FastJSONResponse(Response):
+    """JSON response for plain dicts, lists and pre-encoded bytes.
+
+    Endpoints that return it skip FastAPI's response_model validation and
+    jsonable_encoder pass; `response_model` still documents the shape.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,111 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+from api.metrics import group_commit_batch_size
+
+# Most writes committed in one transaction
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', '256'))
+# How long the writer waits for more writes after the first one (0 = take what is queued)
+GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get('GROUP_COMMIT_MAX_DELAY_MS', '1'))
+
+logger = logging.getLogger("api.group_commit")
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued writes together.
+
+    `submit(operation)` queues `operation(conn)`, which must run one statement
+    and return `(result, changes)`. The writer drains up to `max_batch`
+    operations (waiting at most `max_delay_ms` for stragglers), runs them in
+    one transaction and commits once. `on_commit` then gets the batch's changes
+    in order, and only after that does each caller get its result. A failing
+    statement is rolled back on its own by SQLite, so it fails just its caller.
+    `lock`, if given, is held around each batch transaction.
+    """
+
+    def __init__(self, engine, on_commit=None, max_batch=GROUP_COMMIT_MAX_BATCH,
+                 max_delay_ms=GROUP_COMMIT_MAX_DELAY_MS, lock=None):
+        self.engine = engine
+        self.on_commit = on_commit
+        self.lock = lock
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, operation):
+        """Run `operation` in the next batch and return its result once committed."""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self._worker.start()
+        future = Future()
+        self._queue.put((operation, future))
+        return future.result()
+
+    def close(self):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._queue.put(None)
+                self._worker.join()
+            self._worker = None
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # finish this batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            results = []
+            changes = []
+            try:
+                with self.lock or nullcontext(), self.engine.begin() as conn:
+                    for operation, future in batch:
+                        try:
+                            result, op_changes = operation(conn)
+                        except Exception as e:
+                            results.append((future, None, e))
+                        else:
+                            results.append((future, result, None))
+                            changes.extend(op_changes)
+            except Exception as e:
+                # The commit itself failed: nothing in the batch was written
+                for operation, future in batch:
+                    future.set_exception(e)
+                continue
+
+            group_commit_batch_size.observe(len(batch))
+            if self.on_commit is not None and changes:
+                try:
+                    self.on_commit(changes)
+                except Exception:
+                    # The writes are committed; callers still get their results
+                    logger.exception("on_commit failed for a batch of %d writes", len(batch))
+            for future, result, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
@@ -1,42 +1,159 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Body
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse, Response, StreamingResponse
 from typing import List, Optional
-import pandas as pd
 import os
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import tempfile
+from contextlib import asynccontextmanager
+from html import escape
+from sqlalchemy import delete, insert, select, update
+from starlette.concurrency import run_in_threadpool
+
+from api.access_log import ACCESS_LOG_PATH, AccessLogMiddleware, AccessLogWriter
+from api.async_routes import create_async_router
+from api.bulk import BulkResult, bulk_delete, bulk_insert, bulk_update, iter_records
+from api.cache import LRUCache, etag_matches, make_etag
+from api.changes import (ChangeFollower, ChangeLogPruner, ChangePage, change_bounds, fetch_changes,
+                         iter_change_events, prune_changes)
+from api.columnar import columnar_download_response
+from api.csv_export import csv_download_response
+from api.csv_mirror import CsvMirror
+from api.db import create_sqlite_engine
+from api.fast_json import FastJSONResponse, dumps, user_dict
+from api.group_commit import GroupCommitWriter
+from api.metrics import MetricsMiddleware, db_locked_errors, db_rows_returned, instrument_engine, registry
+from api.models import USERS_PAGE_DEFAULT_LIMIT, USERS_PAGE_MAX_LIMIT, User, UserPage, users_table
+from api.schema import migrate
+from api.search import SEARCH_SORT_KEYS, build_search_query
+from api.snapshot import DbSnapshot, SnapshotTimeout
+from api.stats import AgeBucket, NameCount, UserStats, UserStatsService
+from api.write_lock import WriteLock
+
+# Schema checks and the CSV rebuild run at startup rather than at import
+@asynccontextmanager
+async def lifespan(app):
+    with write_lock:
+        migrate(engine)
+        prune_changes(engine)
+        user_stats.ensure_schema(engine)
+        if csv_mirror_lock.try_acquire():
+            # This worker owns users.csv: it catches up on writes made while no one was
+            # mirroring, then mirrors every write (from any worker or process) from the change log
+            mirrored_seq = csv_mirror.ensure(engine)
+            change_follower.start(invalidate_user_caches, since=mirrored_seq, apply=mirror_followed_changes)
+        else:
+            change_follower.start(invalidate_user_caches)
+    change_log_pruner.start()
+    yield
+    user_writer.close()
+    change_log_pruner.close()
+    change_follower.close()
+    csv_mirror.close()
+    if csv_mirror_lock.held:
+        csv_mirror_lock.release()
+    db_snapshot.close()
+    if access_log is not None:
+        access_log.close()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+# JSONL access log, one record per request (analyze with access_log_analyzer.py)
+access_log = AccessLogWriter() if ACCESS_LOG_PATH else None
+if access_log is not None:
+    app.add_middleware(AccessLogMiddleware, writer=access_log)
+
+# uvicorn worker processes sharing example.db (see start.sh)
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
 
-# Database setup
+# Database setup: writes use `engine`, reads a read-only (mode=ro) engine
 db_path = 'example.db'
-engine = create_engine(f'sqlite:///{db_path}')
-Base = declarative_base()
-
-# Define the User model for SQLAlchemy
-class UserDB(Base):
-    __tablename__ = 'users'
-    id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    age = Column(Integer, nullable=False)
-
-# Create tables
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-
-# Pydantic model for User
-class User(BaseModel):
-    id: Optional[int] = None
-    name: str
-    age: int
-
-# Root endpoint
-@app.get("/", response_class=HTMLResponse)
-def read_root():
-    html_content = """
+engine = create_sqlite_engine(db_path)
+instrument_engine(engine)
+read_engine = create_sqlite_engine(db_path, read_only=True)
+instrument_engine(read_engine)
+
+# Every write path takes this lock, so workers queue instead of hitting "database is locked"
+write_lock = WriteLock(db_path + '.write-lock')
+
+# Follows user_changes to see writes by other workers and processes
+change_follower = ChangeFollower(db_path)
+# Keeps user_changes at CHANGE_LOG_MAX_ROWS while the app runs, not just at startup
+change_log_pruner = ChangeLogPruner(engine, lock=write_lock)
+
+# CSV mirror of the users table, kept up to date row by row (by one worker)
+csv_path = 'users.csv'
+csv_mirror = CsvMirror(csv_path)
+csv_mirror_lock = WriteLock(csv_path + '.lock')
+
+# Consistent snapshot of the database for /download/db, rebuilt after writes
+db_snapshot = DbSnapshot(db_path)
+
+# Read-through cache for get_user, invalidated on every write
+user_cache = LRUCache()
+
+# Aggregates for /users/stats, cached and cleared on every write
+user_stats = UserStatsService(read_engine)
+
+def invalidate_user_caches(changes):
+    for op, row in changes:
+        user_cache.invalidate(row["id"])
+    user_stats.invalidate()
+
+def record_user_changes(changes):
+    # Called after commit with a list of ('insert' | 'put' | 'del', row) changes;
+    # the CSV mirror picks them up from the change log
+    invalidate_user_caches(changes)
+
+def mirror_followed_changes(changes, seq):
+    # Runs on the follower's thread, so requests never wait for CSV writes
+    csv_mirror.record_many(changes, seq=seq)
+
+def follow_other_workers():
+    # Drop cache entries for rows other workers changed (one PRAGMA when idle)
+    if WEB_CONCURRENCY > 1:
+        change_follower.poll()
+
+def with_write_lock(fn, *args):
+    with write_lock:
+        return fn(*args)
+
+# Single-row writes are queued and committed in groups by one writer thread
+user_writer = GroupCommitWriter(engine, record_user_changes, lock=write_lock)
+
+USER_CACHE_COUNTERS = {
+    "hits": "User cache lookups that found the row.",
+    "misses": "User cache lookups that went to the database.",
+    "evictions": "Entries dropped to keep the user cache under maxsize.",
+}
+USER_CACHE_GAUGES = {
+    "size": "Entries in the user cache.",
+    "maxsize": "Most entries the user cache holds.",
+    "ttl": "Seconds a user cache entry lives.",
+}
+
+def collect_cache_metrics():
+    stats = user_cache.stats()
+    lines = []
+    for key, help_text in USER_CACHE_COUNTERS.items():
+        lines.append(f"# HELP user_cache_{key}_total {help_text}")
+        lines.append(f"# TYPE user_cache_{key}_total counter")
+        lines.append(f"user_cache_{key}_total {stats[key]}")
+    for key, help_text in USER_CACHE_GAUGES.items():
+        lines.append(f"# HELP user_cache_{key} {help_text}")
+        lines.append(f"# TYPE user_cache_{key} gauge")
+        lines.append(f"user_cache_{key} {stats[key]}")
+    return lines
+
+registry.add_collector(collect_cache_metrics)
+
+# Async (aiosqlite) versions of the user endpoints under /async
+app.include_router(create_async_router(db_path, record_user_changes, user_cache, write_lock, follow_other_workers))
+
+# Root page, encoded once at import; clients revalidate with the ETag
+ROOT_CACHE_MAX_AGE = int(os.environ.get('ROOT_CACHE_MAX_AGE', '300'))
+
+ROOT_HTML = """
     <html>
         <head>
             <title>User API</title>
@@ -103,6 +220,7 @@ def read_root():
             <a href="/users" class="button">View All Users</a>
             <a href="/docs" class="button">API Documentation</a>
             <a href="/download/csv" class="button">Download CSV</a>
+            <a href="/download/parquet" class="button">Download Parquet</a>
             <a href="/download/db" class="button">Download Database</a>
 
             <script>
@@ -151,33 +269,68 @@ def read_root():
             </script>
         </body>
     </html>
-    """
-    return HTMLResponse(content=html_content)
+    """.encode('utf-8')
+ROOT_ETAG = make_etag(ROOT_HTML)
+
+@app.get("/", response_class=HTMLResponse)
+def read_root(if_none_match: Optional[str] = Header(None)):
+    headers = {"ETag": ROOT_ETAG, "Cache-Control": f"public, max-age={ROOT_CACHE_MAX_AGE}"}
+    if etag_matches(if_none_match, ROOT_ETAG):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=ROOT_HTML, headers=headers)
 
 # Create a new user
 @app.post("/users/", response_model=User)
 def create_user(user: User):
-    session = Session()
-    db_user = UserDB(name=user.name, age=user.age)
-    session.add(db_user)
-    session.commit()
-    user.id = db_user.id
-    session.close()
-    
-    # Update CSV
-    df = pd.read_sql("SELECT * FROM users", engine)
-    df.to_csv('users.csv', index=False)
-    
+    def operation(conn):
+        user_id = conn.execute(
+            insert(users_table).values(name=user.name, age=user.age).returning(users_table.c.id)
+        ).scalar_one()
+        return user_id, [("insert", {"id": user_id, "name": user.name, "age": user.age})]
+
+    # Returns once the batch is committed and the cache is updated; the CSV mirror
+    # follows from the change log within CHANGE_FOLLOW_INTERVAL_MS
+    user.id = user_writer.submit(operation)
     return user
 
-# Get all users
-@app.get("/users/", response_class=HTMLResponse)
-def get_users():
-    session = Session()
-    users = session.query(UserDB).all()
-    session.close()
-    
-    html_content = """
+# Request body formats accepted by the bulk import
+BULK_FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'text/csv': 'csv',
+}
+# Bulk bodies larger than this are spooled to a temp file
+BULK_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Bulk import users from a JSON array, NDJSON stream or CSV body
+@app.post("/users/bulk", response_model=BulkResult)
+async def create_users_bulk(request: Request):
+    content_type = request.headers.get('content-type', 'application/json').split(';')[0].strip()
+    fmt = BULK_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+
+    with tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_MAX_SIZE) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        try:
+            return await run_in_threadpool(with_write_lock, bulk_insert, engine, iter_records(body, fmt),
+                                          record_user_changes)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid {fmt} body: {e}")
+
+# Bulk update users given as a JSON array of {id, name, age}
+@app.put("/users/bulk", response_model=BulkResult)
+def update_users_bulk(records: list = Body(...)):
+    return with_write_lock(bulk_update, engine, records, record_user_changes)
+
+# Bulk delete users given as a JSON array of ids
+@app.delete("/users/bulk", response_model=BulkResult)
+def delete_users_bulk(ids: List[int] = Body(...)):
+    return with_write_lock(bulk_delete, engine, ids, record_user_changes)
+
+USERS_PAGE_HEAD = """
     <html>
         <head>
             <title>All Users</title>
@@ -228,83 +381,225 @@ def get_users():
                     <th>Name</th>
                     <th>Age</th>
                 </tr>
-    """
-    
-    for user in users:
-        html_content += f"""
-                <tr>
-                    <td>{user.id}</td>
-                    <td>{user.name}</td>
-                    <td>{user.age}</td>
-                </tr>
-        """
-    
-    html_content += """
+"""
+
+USERS_PAGE_TAIL = """
             </table>
             <br>
+            {next_link}
             <a href="/" class="back-button">Back to Home</a>
         </body>
     </html>
     """
-    return HTMLResponse(content=html_content)
+
+def fetch_users_page(after_id: int, limit: int):
+    # Keyset pagination: seek past after_id on the primary key index
+    with read_engine.connect() as conn:
+        rows = conn.execute(
+            select(users_table.c.id, users_table.c.name, users_table.c.age)
+            .where(users_table.c.id > after_id)
+            .order_by(users_table.c.id)
+            .limit(limit)
+        ).all()
+    next_after_id = rows[-1].id if len(rows) == limit else None
+    return rows, next_after_id
+
+def render_users_page(rows, next_after_id, limit):
+    parts = [USERS_PAGE_HEAD]
+    for row in rows:
+        parts.append(f"""
+                <tr>
+                    <td>{row.id}</td>
+                    <td>{escape(row.name)}</td>
+                    <td>{row.age}</td>
+                </tr>
+        """)
+    next_link = ""
+    if next_after_id is not None:
+        next_link = f'<a href="/users/?after_id={next_after_id}&limit={limit}" class="back-button">Next Page</a>'
+    parts.append(USERS_PAGE_TAIL.format(next_link=next_link))
+    return "".join(parts)
+
+# Get all users, one page at a time
+@app.get("/users/", response_class=HTMLResponse)
+def get_users(after_id: int = 0, limit: int = Query(USERS_PAGE_DEFAULT_LIMIT, ge=1, le=USERS_PAGE_MAX_LIMIT)):
+    rows, next_after_id = fetch_users_page(after_id, limit)
+    db_rows_returned.observe(len(rows), route="/users/")
+    return HTMLResponse(content=render_users_page(rows, next_after_id, limit))
+
+# JSON listing of users, one page at a time
+@app.get("/api/users", response_model=UserPage)
+def get_users_json(after_id: int = 0, limit: int = Query(USERS_PAGE_DEFAULT_LIMIT, ge=1, le=USERS_PAGE_MAX_LIMIT)):
+    rows, next_after_id = fetch_users_page(after_id, limit)
+    db_rows_returned.observe(len(rows), route="/api/users")
+    return FastJSONResponse({"users": [user_dict(row) for row in rows], "next_after_id": next_after_id})
+
+# Search users by name and age, backed by the name/age indexes and users_fts
+@app.get("/users/search", response_model=List[User])
+def search_users(name_prefix: Optional[str] = None,
+                 name_contains: Optional[str] = None,
+                 min_age: Optional[int] = None,
+                 max_age: Optional[int] = None,
+                 sort: str = Query("id", pattern="^-?(" + "|".join(SEARCH_SORT_KEYS) + ")$"),
+                 limit: int = Query(USERS_PAGE_DEFAULT_LIMIT, ge=1, le=USERS_PAGE_MAX_LIMIT),
+                 offset: int = Query(0, ge=0)):
+    query, params = build_search_query(name_prefix, name_contains, min_age, max_age, sort, limit, offset)
+    with read_engine.connect() as conn:
+        rows = conn.execute(query, params).all()
+    db_rows_returned.observe(len(rows), route="/users/search")
+    return [User(id=row.id, name=row.name, age=row.age) for row in rows]
+
+# Aggregates computed in SQLite (GROUP BY / summary tables), cached until the next write
+@app.get("/users/stats", response_model=UserStats)
+def get_user_stats():
+    follow_other_workers()
+    return user_stats.overview()
+
+@app.get("/users/stats/age-histogram", response_model=List[AgeBucket])
+def get_age_histogram(bucket_size: int = Query(10, ge=1, le=200)):
+    follow_other_workers()
+    return user_stats.age_histogram(bucket_size)
+
+@app.get("/users/stats/names", response_model=List[NameCount])
+def get_name_counts(limit: int = Query(20, ge=1, le=USERS_PAGE_MAX_LIMIT)):
+    follow_other_workers()
+    return user_stats.top_names(limit)
 
 # Get a specific user by ID
 @app.get("/users/{user_id}", response_model=User)
-def get_user(user_id: int):
-    session = Session()
-    user = session.query(UserDB).filter(UserDB.id == user_id).first()
-    session.close()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return User(id=user.id, name=user.name, age=user.age)
+def get_user(user_id: int, if_none_match: Optional[str] = Header(None)):
+    follow_other_workers()
+    # Cached as (JSON bytes, ETag): hits skip the database and serialization entirely
+    cached = user_cache.get(user_id)
+    if cached is None:
+        generation = user_cache.generation
+        with read_engine.connect() as conn:
+            row = conn.execute(
+                select(users_table.c.id, users_table.c.name, users_table.c.age).where(users_table.c.id == user_id)
+            ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        cached = (dumps(user_dict(row)), make_etag(*row))
+        user_cache.set(user_id, cached, generation)
+
+    body, etag = cached
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return FastJSONResponse(body, headers={"ETag": etag})
+
+# Cache hit/miss/eviction counters for get_user
+@app.get("/cache/stats")
+def get_cache_stats():
+    return user_cache.stats()
 
 # Update a user
 @app.put("/users/{user_id}", response_model=User)
 def update_user(user_id: int, updated_user: User):
-    session = Session()
-    user = session.query(UserDB).filter(UserDB.id == user_id).first()
-    if user is None:
-        session.close()
+    def operation(conn):
+        result = conn.execute(
+            update(users_table).where(users_table.c.id == user_id)
+            .values(name=updated_user.name, age=updated_user.age)
+        )
+        if result.rowcount == 0:
+            return False, []
+        return True, [("put", {"id": user_id, "name": updated_user.name, "age": updated_user.age})]
+
+    if not user_writer.submit(operation):
         raise HTTPException(status_code=404, detail="User not found")
-    
-    user.name = updated_user.name
-    user.age = updated_user.age
-    session.commit()
-    session.close()
-    
-    # Update CSV
-    df = pd.read_sql("SELECT * FROM users", engine)
-    df.to_csv('users.csv', index=False)
-    
     return updated_user
 
 # Delete a user
 @app.delete("/users/{user_id}")
 def delete_user(user_id: int):
-    session = Session()
-    user = session.query(UserDB).filter(UserDB.id == user_id).first()
-    if user is None:
-        session.close()
+    def operation(conn):
+        result = conn.execute(delete(users_table).where(users_table.c.id == user_id))
+        if result.rowcount == 0:
+            return False, []
+        return True, [("del", {"id": user_id})]
+
+    if not user_writer.submit(operation):
         raise HTTPException(status_code=404, detail="User not found")
-    
-    session.delete(user)
-    session.commit()
-    session.close()
-    
-    # Update CSV
-    df = pd.read_sql("SELECT * FROM users", engine)
-    df.to_csv('users.csv', index=False)
-    
     return {"message": f"User {user_id} deleted"}
 
 # Download CSV endpoint
 @app.get("/download/csv")
-def download_csv():
-    df = pd.read_sql("SELECT * FROM users", engine)
-    df.to_csv('users.csv', index=False)
-    return FileResponse('users.csv', media_type='text/csv', filename='users.csv')
+def download_csv(gzip: bool = False, after_id: Optional[int] = None,
+                 range_header: Optional[str] = Header(None, alias="range"),
+                 if_range: Optional[str] = Header(None)):
+    return csv_download_response(read_engine, 'users.csv', gzip=gzip, after_id=after_id,
+                                 range_header=range_header, if_range=if_range)
+
+# Columnar exports (typed from UserDB) for analytics jobs; need pyarrow
+@app.get("/download/parquet")
+def download_parquet():
+    return columnar_download_response(read_engine, users_table, 'users.parquet', 'parquet')
+
+@app.get("/download/arrow")
+def download_arrow():
+    return columnar_download_response(read_engine, users_table, 'users.arrows', 'arrow')
+
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 # Download SQLite database endpoint
 @app.get("/download/db")
-def download_db():
-    return FileResponse(db_path, media_type='application/x-sqlite3', filename='example.db')
\ No newline at end of file
+def download_db(gzip: bool = False, if_none_match: Optional[str] = Header(None)):
+    try:
+        snapshot = db_snapshot.get_gzip() if gzip else db_snapshot.get()
+    except SnapshotTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    etag = f'W/{snapshot.etag}' if gzip else snapshot.etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    if gzip:
+        return FileResponse(snapshot.gzip_path, media_type='application/gzip', filename='example.db.gz',
+                            headers={"ETag": etag})
+    return FileResponse(snapshot.path, media_type='application/x-sqlite3', filename='example.db',
+                        headers={"ETag": etag})
+# Change feed: every write to users is logged by triggers with an increasing seq
+def check_changes_since(since):
+    first, last = change_bounds(read_engine)
+    oldest = first if first is not None else last + 1
+    if since < oldest - 1:
+        raise HTTPException(status_code=410, detail="Changes before this seq were pruned; download a fresh copy")
+    return last
+
+@app.get("/changes", response_model=ChangePage)
+def get_changes(response: Response, since: int = Query(0, ge=0),
+                limit: int = Query(USERS_PAGE_MAX_LIMIT, ge=1, le=USERS_PAGE_MAX_LIMIT),
+                if_none_match: Optional[str] = Header(None)):
+    last = check_changes_since(since)
+    etag = make_etag(since, limit, last)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    page = fetch_changes(read_engine, since, limit)
+    db_rows_returned.observe(len(page.changes), route="/changes")
+    return page
+
+# Server-sent events version of /changes; reconnects resume from Last-Event-ID
+@app.get("/changes/stream")
+def stream_changes(request: Request, since: int = Query(0, ge=0), last_event_id: Optional[str] = Header(None)):
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    check_changes_since(since)
+    return StreamingResponse(iter_change_events(read_engine, request, since), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Liveness plus this worker's view of write-lock contention
+@app.get("/health")
+def health():
+    with read_engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "workers": WEB_CONCURRENCY,
+        "csv_mirror_owner": csv_mirror_lock.held,
+        "change_seq": change_follower.seq,
+        "write_lock": write_lock.stats(),
+        "access_log": access_log.stats() if access_log is not None else None,
+        "db_locked_errors": db_locked_errors.value(),
+    }
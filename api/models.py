@@ -0,0 +1,35 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Column, Index, Integer, String
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+# Define the User model for SQLAlchemy
+class UserDB(Base):
+    __tablename__ = 'users'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, index=True)
+    age = Column(Integer, nullable=False, index=True)
+
+    # Case-insensitive name index for /users/search prefixes, matching name_contains
+    __table_args__ = (Index('ix_users_name_nocase', name.collate('NOCASE')),)
+
+# Core handle on the same table, for statements that skip the ORM
+users_table = UserDB.__table__
+
+# Pydantic model for User
+class User(BaseModel):
+    id: Optional[int] = None
+    name: str
+    age: int
+
+# Page size limits for the users listing
+USERS_PAGE_DEFAULT_LIMIT = 100
+USERS_PAGE_MAX_LIMIT = 1000
+
+# Pydantic model for one page of users
+class UserPage(BaseModel):
+    users: List[User]
+    next_after_id: Optional[int] = None
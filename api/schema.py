@@ -0,0 +1,29 @@
+from api.changes import ensure_changes_schema
+from api.models import Base, UserDB
+from api.search import ensure_search_schema
+
+# Stored in PRAGMA user_version; bump when tables, indexes, triggers or FTS change
+# 2: user_changes log
+# 3: NOCASE name index for search prefixes
+SCHEMA_VERSION = 3
+
+
+def schema_version(engine):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine):
+    """Bring the database up to SCHEMA_VERSION and return True if anything ran.
+
+    A database already stamped with the current version costs a single PRAGMA
+    read, so restarts skip create_all and the index/FTS checks entirely.
+    """
+    if schema_version(engine) == SCHEMA_VERSION:
+        return False
+    Base.metadata.create_all(engine)
+    ensure_search_schema(engine, UserDB.__table__)
+    ensure_changes_schema(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
@@ -0,0 +1,81 @@
+from sqlalchemy import text
+
+# Sort keys accepted by /users/search ('-' prefix for descending)
+SEARCH_SORT_KEYS = ('id', 'name', 'age')
+
+# Substring searches shorter than this cannot use the trigram index
+FTS_MIN_TERM_LENGTH = 3
+
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        name, content='users', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO users_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+]
+
+
+def ensure_search_schema(engine, table):
+    """Create the name/age indexes and the trigger-synced FTS5 table if missing."""
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+        ).first()
+        for statement in FTS_SCHEMA:
+            conn.exec_driver_sql(statement)
+        if exists is None:
+            # Index the rows that were there before the triggers existed
+            conn.exec_driver_sql("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def build_search_query(name_prefix=None, name_contains=None, min_age=None, max_age=None,
+                       sort='id', limit=100, offset=0):
+    """Build the SELECT for /users/search, using an index for every filter.
+
+    Prefixes become a range on the NOCASE name index, substrings a trigram
+    FTS5 match (short terms fall back to LIKE), and ages a range on the age
+    index. Both name filters ignore ASCII case.
+    """
+    conditions = []
+    params = {}
+    if name_prefix:
+        conditions.append("name COLLATE NOCASE >= :prefix_low AND name COLLATE NOCASE < :prefix_high")
+        params["prefix_low"] = name_prefix
+        params["prefix_high"] = name_prefix + "\U0010ffff"
+    if name_contains:
+        if len(name_contains) >= FTS_MIN_TERM_LENGTH:
+            conditions.append("id IN (SELECT rowid FROM users_fts WHERE users_fts MATCH :fts_term)")
+            params["fts_term"] = '"' + name_contains.replace('"', '""') + '"'
+        else:
+            conditions.append("name LIKE :like_term ESCAPE '\\'")
+            escaped = name_contains.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params["like_term"] = f"%{escaped}%"
+    if min_age is not None:
+        conditions.append("age >= :min_age")
+        params["min_age"] = min_age
+    if max_age is not None:
+        conditions.append("age <= :max_age")
+        params["max_age"] = max_age
+
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in SEARCH_SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    direction = "DESC" if descending else "ASC"
+    order_by = f"{key} {direction}" if key == 'id' else f"{key} {direction}, id {direction}"
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT id, name, age FROM users {where} ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+    params["limit"] = limit
+    params["offset"] = offset
+    return text(sql), params
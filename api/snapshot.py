@@ -0,0 +1,129 @@
+import glob
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+# Snapshot settings (override with environment variables)
+DB_SNAPSHOT_DIR = os.environ.get('DB_SNAPSHOT_DIR', '.snapshots')
+# Longest a download waits for a copy to be built (or for another caller's build)
+DB_SNAPSHOT_TIMEOUT = float(os.environ.get('DB_SNAPSHOT_TIMEOUT', '60'))
+
+
+class SnapshotTimeout(Exception):
+    pass
+
+
+class Snapshot:
+    def __init__(self, path, etag):
+        self.path = path
+        self.etag = etag
+        self.gzip_path = None
+
+
+class DbSnapshot:
+    """Consistent, cached copies of a live SQLite database for download.
+
+    Copies are made with VACUUM INTO, which reads from one snapshot (under WAL
+    it never blocks writers, and unlike a stepped backup it is not restarted
+    by their commits). A copy is reused until `PRAGMA data_version` shows that
+    some connection has committed since. Waiting for the lock or building past
+    `timeout` seconds raises SnapshotTimeout.
+    """
+
+    def __init__(self, db_path, snapshot_dir=DB_SNAPSHOT_DIR, timeout=DB_SNAPSHOT_TIMEOUT):
+        self.db_path = db_path
+        self.snapshot_dir = snapshot_dir
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._current = None
+        self._version = None
+        # Watches data_version; it changes when any other connection commits.
+        # Opened on first use, so creating a DbSnapshot never touches the database
+        self._watch_conn = None
+
+    def get(self):
+        deadline = time.monotonic() + self.timeout
+        if not self._lock.acquire(timeout=self.timeout):
+            raise SnapshotTimeout(f"snapshot of {self.db_path} is still being built")
+        try:
+            if self._watch_conn is None:
+                self._watch_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            # Another worker process may have removed our copy as stale
+            if self._current is None or version != self._version or not os.path.exists(self._current.path):
+                self._current = self._build(deadline)
+                self._version = version
+            return self._current
+        finally:
+            self._lock.release()
+
+    def get_gzip(self):
+        snapshot = self.get()
+        if not self._lock.acquire(timeout=self.timeout):
+            raise SnapshotTimeout(f"snapshot of {self.db_path} is still being built")
+        try:
+            if snapshot.gzip_path is None:
+                gzip_path = snapshot.path + '.gz'
+                tmp_path = f'{gzip_path}.{os.getpid()}.tmp'
+                # Same content hash, so another worker's finished .gz is ours too
+                if not os.path.exists(gzip_path):
+                    with open(snapshot.path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    os.replace(tmp_path, gzip_path)
+                snapshot.gzip_path = gzip_path
+            return snapshot
+        finally:
+            self._lock.release()
+
+    def close(self):
+        with self._lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+
+    def _build(self, deadline):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        tmp_path = os.path.join(self.snapshot_dir, f'building-{os.getpid()}.db')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        src = sqlite3.connect(self.db_path)
+        # Abort the copy once the deadline passes (checked every 10k VM steps)
+        src.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            # The copy is a plain rollback-journal database (no -wal file needed to open it)
+            src.execute("VACUUM INTO ?", (tmp_path,))
+        except sqlite3.OperationalError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if time.monotonic() > deadline:
+                raise SnapshotTimeout(f"snapshot of {self.db_path} took longer than {self.timeout}s")
+            raise
+        finally:
+            src.close()
+
+        digest = hashlib.blake2b(digest_size=12)
+        with open(tmp_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        etag = f'"{digest.hexdigest()}"'
+
+        path = os.path.join(self.snapshot_dir, f'snapshot-{digest.hexdigest()}.db')
+        if self._current is not None and self._current.path == path:
+            os.remove(tmp_path)
+            return self._current
+        os.replace(tmp_path, path)
+        self._remove_old(keep={path, self._current.path if self._current else None})
+        return Snapshot(path, etag)
+
+    def _remove_old(self, keep):
+        # The previous snapshot is kept so in-flight downloads can finish
+        for path in glob.glob(os.path.join(self.snapshot_dir, 'snapshot-*.db')):
+            if path not in keep:
+                for stale in (path, path + '.gz'):
+                    if os.path.exists(stale):
+                        os.remove(stale)
@@ -0,0 +1,148 @@
+import os
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import text
+
+from api.cache import LRUCache
+
+# Keep users_summary / users_age_counts / users_name_counts up to date with triggers
+USER_STATS_TRIGGERS = os.environ.get('USER_STATS_TRIGGERS', '1') == '1'
+# Seconds a computed statistic is served from cache (writes clear it sooner)
+USER_STATS_CACHE_TTL = float(os.environ.get('USER_STATS_CACHE_TTL', '300'))
+
+SUMMARY_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS users_summary (id INTEGER PRIMARY KEY CHECK (id = 1), "
+    "count INTEGER NOT NULL, age_sum INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS users_age_counts (age INTEGER PRIMARY KEY, count INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS users_name_counts (name TEXT PRIMARY KEY, count INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_counts_count ON users_name_counts (count)",
+    """CREATE TRIGGER IF NOT EXISTS users_stats_insert AFTER INSERT ON users BEGIN
+        UPDATE users_summary SET count = count + 1, age_sum = age_sum + new.age WHERE id = 1;
+        INSERT INTO users_age_counts (age, count) VALUES (new.age, 1)
+            ON CONFLICT (age) DO UPDATE SET count = count + 1;
+        INSERT INTO users_name_counts (name, count) VALUES (new.name, 1)
+            ON CONFLICT (name) DO UPDATE SET count = count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_stats_delete AFTER DELETE ON users BEGIN
+        UPDATE users_summary SET count = count - 1, age_sum = age_sum - old.age WHERE id = 1;
+        UPDATE users_age_counts SET count = count - 1 WHERE age = old.age;
+        DELETE FROM users_age_counts WHERE age = old.age AND count <= 0;
+        UPDATE users_name_counts SET count = count - 1 WHERE name = old.name;
+        DELETE FROM users_name_counts WHERE name = old.name AND count <= 0;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_stats_update AFTER UPDATE OF name, age ON users BEGIN
+        UPDATE users_summary SET age_sum = age_sum - old.age + new.age WHERE id = 1;
+        UPDATE users_age_counts SET count = count - 1 WHERE age = old.age;
+        DELETE FROM users_age_counts WHERE age = old.age AND count <= 0;
+        INSERT INTO users_age_counts (age, count) VALUES (new.age, 1)
+            ON CONFLICT (age) DO UPDATE SET count = count + 1;
+        UPDATE users_name_counts SET count = count - 1 WHERE name = old.name;
+        DELETE FROM users_name_counts WHERE name = old.name AND count <= 0;
+        INSERT INTO users_name_counts (name, count) VALUES (new.name, 1)
+            ON CONFLICT (name) DO UPDATE SET count = count + 1;
+    END""",
+]
+
+SUMMARY_BACKFILL = [
+    "DELETE FROM users_summary",
+    "INSERT INTO users_summary (id, count, age_sum) SELECT 1, COUNT(*), COALESCE(SUM(age), 0) FROM users",
+    "DELETE FROM users_age_counts",
+    "INSERT INTO users_age_counts (age, count) SELECT age, COUNT(*) FROM users GROUP BY age",
+    "DELETE FROM users_name_counts",
+    "INSERT INTO users_name_counts (name, count) SELECT name, COUNT(*) FROM users GROUP BY name",
+]
+
+
+class UserStats(BaseModel):
+    count: int
+    avg_age: Optional[float] = None
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+
+
+class AgeBucket(BaseModel):
+    age_from: int
+    age_to: int
+    count: int
+
+
+class NameCount(BaseModel):
+    name: str
+    count: int
+
+
+class UserStatsService:
+    """Aggregates over the users table, computed in SQLite and cached.
+
+    With `use_summary` the numbers come from small summary tables that
+    triggers keep current, so a cache miss is O(distinct values) instead of a
+    scan of users. Call `invalidate()` after writes.
+    """
+
+    def __init__(self, engine, use_summary=USER_STATS_TRIGGERS, ttl=USER_STATS_CACHE_TTL):
+        self.engine = engine
+        self.use_summary = use_summary
+        self.cache = LRUCache(maxsize=256, ttl=ttl)
+
+    def ensure_schema(self, engine=None):
+        # `engine` must be writable when the service reads through a read-only one
+        if not self.use_summary:
+            return
+        with (engine or self.engine).begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_summary'")
+            ).first()
+            if exists is not None:
+                return  # tables and triggers are created together
+            for statement in SUMMARY_SCHEMA + SUMMARY_BACKFILL:
+                conn.exec_driver_sql(statement)
+
+    def invalidate(self):
+        self.cache.clear()
+
+    def _cached(self, key, compute):
+        generation = self.cache.generation
+        value = self.cache.get(key)
+        if value is None:
+            value = compute()
+            self.cache.set(key, value, generation)
+        return value
+
+    def overview(self):
+        return self._cached(('overview',), self._overview)
+
+    def age_histogram(self, bucket_size):
+        return self._cached(('age_histogram', bucket_size), lambda: self._age_histogram(bucket_size))
+
+    def top_names(self, limit):
+        return self._cached(('top_names', limit), lambda: self._top_names(limit))
+
+    def _overview(self):
+        with self.engine.connect() as conn:
+            # MIN/MAX are single lookups on the age index either way
+            min_age, max_age = conn.execute(text("SELECT MIN(age), MAX(age) FROM users")).one()
+            if self.use_summary:
+                count, age_sum = conn.execute(text("SELECT count, age_sum FROM users_summary WHERE id = 1")).one()
+                avg_age = age_sum / count if count else None
+            else:
+                count, avg_age = conn.execute(text("SELECT COUNT(*), AVG(age) FROM users")).one()
+        return UserStats(count=count, avg_age=avg_age, min_age=min_age, max_age=max_age)
+
+    def _age_histogram(self, bucket_size):
+        source = "users_age_counts" if self.use_summary else "(SELECT age, 1 AS count FROM users)"
+        # Floor to the bucket start; age / :size truncates toward zero, merging -9..9 into 0
+        sql = (f"SELECT age - ((age % :size) + :size) % :size AS bucket, SUM(count) FROM {source} "
+               f"GROUP BY bucket ORDER BY bucket")
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(sql), {"size": bucket_size}).all()
+        return [AgeBucket(age_from=bucket, age_to=bucket + bucket_size - 1, count=count) for bucket, count in rows]
+
+    def _top_names(self, limit):
+        if self.use_summary:
+            sql = "SELECT name, count FROM users_name_counts ORDER BY count DESC, name LIMIT :limit"
+        else:
+            sql = "SELECT name, COUNT(*) AS count FROM users GROUP BY name ORDER BY count DESC, name LIMIT :limit"
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(sql), {"limit": limit}).all()
+        return [NameCount(name=name, count=count) for name, count in rows]
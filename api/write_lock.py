@@ -0,0 +1,96 @@
+import fcntl
+import os
+import threading
+import time
+
+from api.metrics import write_lock_wait
+
+# Waits longer than this count as contended in the stats
+WRITE_LOCK_CONTENDED_MS = float(os.environ.get('WRITE_LOCK_CONTENDED_MS', '1'))
+
+
+class WriteLock:
+    """Process- and thread-wide exclusive lock around database writes.
+
+    Every write path (group commit, bulk, async writer, migrations) takes it,
+    so uvicorn workers queue on an flock instead of racing for SQLite's write
+    lock and failing with "database is locked" once busy_timeout runs out.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+        self._stats_lock = threading.Lock()
+        self._acquired = 0
+        self._contended = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._held_since = None
+
+    def acquire(self):
+        start = time.perf_counter()
+        self._thread_lock.acquire()
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        waited = time.perf_counter() - start
+        self._held_since = time.monotonic()
+        write_lock_wait.observe(waited)
+        with self._stats_lock:
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            if waited * 1000 >= WRITE_LOCK_CONTENDED_MS:
+                self._contended += 1
+
+    def try_acquire(self):
+        """Take the lock only if it is free right now; returns True if taken."""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._thread_lock.release()
+            return False
+        self._held_since = time.monotonic()
+        return True
+
+    @property
+    def held(self):
+        return self._held_since is not None
+
+    def release(self):
+        self._held_since = None
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def stats(self):
+        with self._stats_lock:
+            held_since = self._held_since
+            return {
+                'acquired': self._acquired,
+                'contended': self._contended,
+                'wait_seconds_total': self._wait_total,
+                'wait_seconds_max': self._wait_max,
+                'held_seconds': time.monotonic() - held_since if held_since is not None else 0.0,
+            }
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
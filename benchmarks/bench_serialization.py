@@ -0,0 +1,148 @@
+"""Compare the ORM + Pydantic read path with the Core tuple + fast JSON path.
+
+Builds a throwaway FastAPI app over a seeded scratch database with each
+endpoint in both styles, so the numbers isolate hydration and serialization:
+
+  orm   session.query(UserDB) -> User models -> response_model validation
+  fast  Core select() tuples -> dicts -> FastJSONResponse (orjson if installed)
+
+    python benchmarks/bench_serialization.py --rows 100000 --repeat 20
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from bench_users_api import REPO_ROOT, RESULTS_DIR, seed_database
+
+sys.path.insert(0, REPO_ROOT)
+
+from fastapi import FastAPI, HTTPException  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from api.db import create_sqlite_engine  # noqa: E402
+from api.fast_json import FastJSONResponse, orjson, user_dict  # noqa: E402
+from api.models import User, UserDB, users_table  # noqa: E402
+
+
+def build_app(db_path, page_size):
+    engine = create_sqlite_engine(db_path)
+    Session = sessionmaker(bind=engine)
+    app = FastAPI()
+    columns = (users_table.c.id, users_table.c.name, users_table.c.age)
+
+    @app.get("/orm/users/{user_id}", response_model=User)
+    def orm_user(user_id: int):
+        session = Session()
+        user = session.query(UserDB).filter(UserDB.id == user_id).first()
+        session.close()
+        if user is None:
+            raise HTTPException(status_code=404)
+        return User(id=user.id, name=user.name, age=user.age)
+
+    @app.get("/fast/users/{user_id}", response_model=User)
+    def fast_user(user_id: int):
+        with engine.connect() as conn:
+            row = conn.execute(select(*columns).where(users_table.c.id == user_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404)
+        return FastJSONResponse(user_dict(row))
+
+    @app.get("/orm/page", response_model=List[User])
+    def orm_page():
+        session = Session()
+        users = session.query(UserDB).order_by(UserDB.id).limit(page_size).all()
+        session.close()
+        return [User(id=u.id, name=u.name, age=u.age) for u in users]
+
+    @app.get("/fast/page", response_model=List[User])
+    def fast_page():
+        with engine.connect() as conn:
+            rows = conn.execute(select(*columns).order_by(users_table.c.id).limit(page_size)).all()
+        return FastJSONResponse([user_dict(row) for row in rows])
+
+    @app.get("/orm/all")
+    def orm_all():
+        session = Session()
+        users = session.query(UserDB).all()
+        session.close()
+        return [{"id": u.id, "name": u.name, "age": u.age} for u in users]
+
+    @app.get("/fast/all")
+    def fast_all():
+        with engine.connect() as conn:
+            rows = conn.execute(select(*columns)).all()
+        return FastJSONResponse([user_dict(row) for row in rows])
+
+    return app
+
+
+def time_calls(client, path, repeat):
+    client.get(path)  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read-path serialization")
+    parser.add_argument('--rows', type=int, default=100000, help="users to seed")
+    parser.add_argument('--page-size', type=int, default=1000, help="rows in the page endpoint")
+    parser.add_argument('--repeat', type=int, default=20, help="timed calls per endpoint")
+    parser.add_argument('--output', default=None, help="result JSON path (default benchmarks/results/)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_serial_')
+    try:
+        db_path = os.path.join(workdir, 'example.db')
+        seed_database(db_path, args.rows)
+        client = TestClient(build_app(db_path, args.page_size))
+        results = {}
+        for name, path, repeat in (('single_user', '/users/{}', args.repeat * 50),
+                                   ('page', '/page', args.repeat),
+                                   ('all_rows', '/all', max(3, args.repeat // 5))):
+            target = path.format(args.rows // 2)
+            orm_ms = time_calls(client, '/orm' + target, repeat)
+            fast_ms = time_calls(client, '/fast' + target, repeat)
+            results[name] = {'orm_ms': orm_ms, 'fast_ms': fast_ms, 'speedup': orm_ms / fast_ms}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'rows': args.rows,
+        'page_size': args.page_size,
+        'json_encoder': 'orjson' if orjson is not None else 'json',
+        'results': results,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'{stamp}_serialization_{args.rows}.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'endpoint':<12} {'orm ms':>9} {'fast ms':>9} {'speedup':>8}")
+    for name, r in results.items():
+        print(f"{name:<12} {r['orm_ms']:>9.2f} {r['fast_ms']:>9.2f} {r['speedup']:>7.1f}x")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
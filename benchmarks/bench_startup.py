@@ -0,0 +1,123 @@
+"""Cold-start profile for the User API.
+
+Starts a fresh interpreter --runs times against a scratch copy of the
+database and reports how long `import api.main`, the lifespan startup and the
+first request to / take, plus the slowest modules from `python -X importtime`.
+The first run boots against an unmigrated database; later runs show a restart.
+
+    python benchmarks/bench_startup.py --rows 100000 --runs 5
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from bench_users_api import REPO_ROOT, RESULTS_DIR, seed_database
+
+# Runs in the child interpreter; TestClient is imported first so httpx is not counted
+PHASES_SCRIPT = """
+import json, time
+from fastapi.testclient import TestClient
+t0 = time.perf_counter()
+from api.main import app
+t1 = time.perf_counter()
+client = TestClient(app)
+client.__enter__()
+t2 = time.perf_counter()
+client.get('/')
+t3 = time.perf_counter()
+client.__exit__(None, None, None)
+print(json.dumps({'import_ms': (t1 - t0) * 1000, 'startup_ms': (t2 - t1) * 1000,
+                  'first_request_ms': (t3 - t2) * 1000, 'total_ms': (t3 - t0) * 1000}))
+"""
+
+
+def run_phases(workdir):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', PHASES_SCRIPT],
+                         cwd=workdir, env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(workdir, top):
+    """Top modules by cumulative import time (microseconds) for `import api.main`."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', 'import api.main'],
+                         cwd=workdir, env=env, check=True, capture_output=True, text=True)
+    modules = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # importtime indents nested imports by two spaces after the separator
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append({
+            'module': name.strip(),
+            'depth': depth,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+        })
+    # Direct imports only, so nested modules are not counted twice
+    direct = [m for m in modules if m['depth'] <= 1]
+    direct.sort(key=lambda m: m['cumulative_us'], reverse=True)
+    return direct[:top]
+
+
+def summarize(runs):
+    keys = runs[0].keys()
+    return {key: statistics.median(run[key] for run in runs) for key in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile User API cold start")
+    parser.add_argument('--rows', type=int, default=10000, help="users to seed")
+    parser.add_argument('--runs', type=int, default=5, help="interpreter starts (first one migrates)")
+    parser.add_argument('--top', type=int, default=15, help="modules to list from -X importtime")
+    parser.add_argument('--output', default=None, help="result JSON path (default benchmarks/results/)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_startup_')
+    try:
+        seed_database(os.path.join(workdir, 'example.db'), args.rows)
+        runs = [run_phases(workdir) for _ in range(args.runs)]
+        modules = import_profile(workdir, args.top)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'rows': args.rows,
+        'first_boot': runs[0],
+        'restart_median': summarize(runs[1:]) if len(runs) > 1 else None,
+        'runs': runs,
+        'slowest_imports': modules,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'{stamp}_startup_{args.rows}.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'phase':<18} {'first boot':>11} {'restart':>9}")
+    for key in ('import_ms', 'startup_ms', 'first_request_ms', 'total_ms'):
+        restart = report['restart_median'][key] if report['restart_median'] else float('nan')
+        print(f"{key:<18} {runs[0][key]:>11.1f} {restart:>9.1f}")
+    print(f"\n{'module':<40} {'cumulative ms':>14}")
+    for module in modules:
+        print(f"{module['module']:<40} {module['cumulative_us'] / 1000:>14.1f}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""Load-testing harness for the User API.
+
+Seeds a scratch copy of example.db with --rows users, drives the app with a
+mixed read/write workload and writes p50/p95/p99 latency and requests/sec
+per endpoint, plus the run's peak RSS, to a JSON file so runs can be compared
+over time. Peak RSS is a per-process high-water mark, so a mixed run can only
+report one figure; --per-endpoint runs each operation alone in a fresh
+process (and fresh database) to get a peak RSS per endpoint.
+
+    python benchmarks/bench_users_api.py --rows 100000 --requests 5000
+    python benchmarks/bench_users_api.py --mode uvicorn --concurrency 16
+    python benchmarks/bench_users_api.py --per-endpoint --requests 1000
+
+`--mode inprocess` drives the ASGI app through FastAPI's TestClient;
+`--mode uvicorn` starts `uvicorn api.main:app` on a local port and talks to it
+over HTTP. Both need httpx installed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+# Default mix of operations (weights)
+DEFAULT_MIX = {
+    'get_user': 60,
+    'list_users': 15,
+    'list_users_json': 10,
+    'create_user': 8,
+    'update_user': 5,
+    'delete_user': 2,
+}
+
+
+def seed_database(db_path, rows, batch_size=50000):
+    """Create `db_path` with a users table holding `rows` generated users."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, age INTEGER NOT NULL)")
+    rng = random.Random(42)
+    with conn:
+        for start in range(0, rows, batch_size):
+            count = min(batch_size, rows - start)
+            conn.executemany(
+                "INSERT INTO users (name, age) VALUES (?, ?)",
+                ((f"user{start + i}", rng.randint(18, 90)) for i in range(count)),
+            )
+    conn.close()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def peak_rss_kb(pid=None):
+    """Peak resident set size in KiB for `pid` (or this process)."""
+    if pid is None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(pid):
+    """Every live descendant of `pid` (uvicorn workers and their helpers), from /proc."""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # ppid is the second field after the parenthesised command name
+                parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    found = []
+    frontier = [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent]
+        found.extend(children)
+        frontier.extend(children)
+    return found
+
+
+class Workload:
+    """Picks operations from the mix and issues them against an HTTP client."""
+
+    def __init__(self, client, max_id, mix, seed):
+        self.client = client
+        self.max_id = max_id
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.rng = random.Random(seed)
+
+    def run_one(self):
+        op = self.rng.choices(self.ops, self.weights)[0]
+        user_id = self.rng.randint(1, max(self.max_id, 1))
+        start = time.perf_counter()
+        if op == 'get_user':
+            response = self.client.get(f'/users/{user_id}')
+        elif op == 'list_users':
+            response = self.client.get('/users/', params={'after_id': user_id, 'limit': 100})
+        elif op == 'list_users_json':
+            response = self.client.get('/api/users', params={'after_id': user_id, 'limit': 100})
+        elif op == 'create_user':
+            response = self.client.post('/users/', json={'name': 'bench', 'age': 30})
+        elif op == 'update_user':
+            response = self.client.put(f'/users/{user_id}', json={'name': 'bench-upd', 'age': 31})
+        elif op == 'delete_user':
+            response = self.client.delete(f'/users/{user_id}')
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+        elapsed = time.perf_counter() - start
+        # 404 is expected once random ids hit deleted rows
+        ok = response.status_code < 400 or response.status_code == 404
+        return op, elapsed, ok
+
+
+def run_workload(make_client, max_id, mix, total_requests, concurrency, seed):
+    samples = {op: [] for op in mix}
+    errors = {op: 0 for op in mix}
+
+    def worker(worker_index, count):
+        with make_client() as client:
+            workload = Workload(client, max_id, mix, seed + worker_index)
+            return [workload.run_one() for _ in range(count)]
+
+    per_worker = [total_requests // concurrency] * concurrency
+    for i in range(total_requests % concurrency):
+        per_worker[i] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker, i, count) for i, count in enumerate(per_worker)]
+        for future in futures:
+            for op, elapsed, ok in future.result():
+                samples[op].append(elapsed)
+                if not ok:
+                    errors[op] += 1
+    wall = time.perf_counter() - start
+
+    endpoints = {}
+    for op, values in samples.items():
+        if not values:
+            continue
+        values.sort()
+        endpoints[op] = {
+            'requests': len(values),
+            'errors': errors[op],
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'mean_ms': statistics.fmean(values) * 1000,
+            'rps': len(values) / wall,
+        }
+    return {'wall_seconds': wall, 'total_rps': total_requests / wall, 'endpoints': endpoints}
+
+
+def bench_inprocess(workdir, args, mix):
+    # api.main opens example.db and users.csv relative to the working directory
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    with TestClient(app) as shared:
+        result = run_workload(lambda: _NoClose(shared), args.rows, mix, args.requests, args.concurrency, args.seed)
+    result['peak_rss_kb'] = peak_rss_kb()
+    return result
+
+
+def bench_uvicorn(workdir, args, mix):
+    import httpx
+
+    port = args.port or _free_port()
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, WEB_CONCURRENCY=str(args.workers))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning', '--workers', str(args.workers)],
+        cwd=workdir, env=env,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_for_server(base_url, server)
+        result = run_workload(lambda: httpx.Client(base_url=base_url, timeout=60),
+                              args.rows, mix, args.requests, args.concurrency, args.seed)
+        # With --workers the supervisor only forks; requests are served by its children.
+        # Each process peaks at a different moment, so the total is an upper bound.
+        workers = {pid: peak_rss_kb(pid) for pid in child_pids(server.pid)}
+        result['supervisor_peak_rss_kb'] = peak_rss_kb(server.pid)
+        result['worker_peak_rss_kb'] = [kb for kb in workers.values() if kb is not None]
+        result['peak_rss_kb'] = (result['supervisor_peak_rss_kb'] or 0) + sum(result['worker_peak_rss_kb'])
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return result
+
+
+class _NoClose:
+    """Lets worker threads share one TestClient inside `with` blocks."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        return self.client
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_server(base_url, server, timeout=30):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            httpx.get(f'{base_url}/api/users', params={'limit': 1}, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def bench_single(args):
+    workdir = tempfile.mkdtemp(prefix='bench_users_')
+    try:
+        seed_start = time.perf_counter()
+        seed_database(os.path.join(workdir, 'example.db'), args.rows)
+        seed_seconds = time.perf_counter() - seed_start
+
+        if args.mode == 'inprocess':
+            result = bench_inprocess(workdir, args, args.mix)
+        else:
+            result = bench_uvicorn(workdir, args, args.mix)
+    finally:
+        os.chdir(REPO_ROOT)
+        if args.keep:
+            print(f"Scratch database kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return result, seed_seconds
+
+
+def bench_per_endpoint(args):
+    """Run each operation in the mix alone in a child process, for a peak RSS per endpoint."""
+    result = {'wall_seconds': 0.0, 'endpoints': {}}
+    for op in args.mix:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            output = f.name
+        try:
+            command = [sys.executable, os.path.abspath(__file__), '--mix', f'{op}=1', '--output', output,
+                       '--rows', str(args.rows), '--requests', str(args.requests),
+                       '--concurrency', str(args.concurrency), '--mode', args.mode,
+                       '--workers', str(args.workers), '--seed', str(args.seed)]
+            if args.port:
+                command += ['--port', str(args.port)]
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            with open(output) as f:
+                run = json.load(f)
+        finally:
+            os.remove(output)
+        stats = run['endpoints'][op]
+        stats['peak_rss_kb'] = run['peak_rss_kb']
+        result['endpoints'][op] = stats
+        result['wall_seconds'] += run['wall_seconds']
+    result['total_rps'] = len(args.mix) * args.requests / result['wall_seconds']
+    result['peak_rss_kb'] = max(stats['peak_rss_kb'] for stats in result['endpoints'].values())
+    return result
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        op, weight = part.split('=')
+        if op not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation: {op}")
+        mix[op] = int(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the User API")
+    parser.add_argument('--rows', type=int, default=10000, help="users to seed (1k to 10M)")
+    parser.add_argument('--requests', type=int, default=2000, help="total requests to issue")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent client threads")
+    parser.add_argument('--mode', choices=['inprocess', 'uvicorn'], default='inprocess')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="operation weights, e.g. get_user=80,create_user=20")
+    parser.add_argument('--port', type=int, default=None, help="port for --mode uvicorn")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn worker processes for --mode uvicorn")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help="result JSON path (default benchmarks/results/)")
+    parser.add_argument('--keep', action='store_true', help="keep the scratch database directory")
+    parser.add_argument('--per-endpoint', action='store_true',
+                        help="run each operation alone, --requests each, to measure peak RSS per endpoint")
+    args = parser.parse_args()
+
+    if args.per_endpoint:
+        result = bench_per_endpoint(args)
+        seed_seconds = None
+    else:
+        result, seed_seconds = bench_single(args)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'mode': args.mode,
+        'rows': args.rows,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'workers': args.workers,
+        'mix': args.mix,
+        'per_endpoint': args.per_endpoint,
+        'seed_seconds': seed_seconds,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        **result,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'{stamp}_{args.mode}_{args.rows}.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    rss_column = f" {'rss KiB':>9}" if args.per_endpoint else ''
+    print(f"{'endpoint':<18} {'reqs':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rps':>8}{rss_column}")
+    for op, stats in result['endpoints'].items():
+        rss = f" {stats['peak_rss_kb']:>9}" if args.per_endpoint else ''
+        print(f"{op:<18} {stats['requests']:>6} {stats['errors']:>4} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['rps']:>8.1f}{rss}")
+    print(f"total {result['total_rps']:.1f} req/s, peak RSS {result['peak_rss_kb']} KiB")
+    if result.get('worker_peak_rss_kb'):
+        print(f"  supervisor {result['supervisor_peak_rss_kb']} KiB, "
+              f"processes under it {', '.join(str(kb) for kb in result['worker_peak_rss_kb'])} KiB")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
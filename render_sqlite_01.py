@@ -1,17 +1,23 @@
 import os
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from typing import Optional
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header
 from fastapi.responses import FileResponse
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import Column, Integer, String, select
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import pandas as pd
+
+from api.bulk import bulk_insert, iter_records
+from api.csv_export import csv_download_response
+from api.db import create_sqlite_engine
+from api.fast_json import FastJSONResponse, user_dict
+from api.snapshot import DbSnapshot, SnapshotTimeout
 
 app = FastAPI()
 
 db_path = 'example.db'
 
 # Create the database engine
-engine = create_engine(f'sqlite:///{db_path}')
+engine = create_sqlite_engine(db_path)
 Base = declarative_base()
 
 # Define the User model
@@ -28,6 +34,9 @@ Base.metadata.create_all(engine)
 # Create a session
 Session = sessionmaker(bind=engine)
 
+# Consistent snapshot of the database for downloads
+db_snapshot = DbSnapshot(db_path)
+
 @app.get("/")
 def root():
     return {"message": "Welcome to the User Management API"}
@@ -41,31 +50,39 @@ def add_user(name: str, age: int):
     session.close()
     return {"message": f"Added new user: {name}"}
 
+@app.post("/users/bulk/")
+def add_users_bulk(file: UploadFile = File(...)):
+    try:
+        result = bulk_insert(engine, iter_records(file.file, 'csv'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+    return result
+
 @app.get("/users/")
 def get_users():
-    session = Session()
-    users = session.query(User).all()
-    session.close()
-    return [{"id": user.id, "name": user.name, "age": user.age} for user in users]
+    # Plain tuples from Core, serialized in one pass (no ORM objects)
+    with engine.connect() as conn:
+        rows = conn.execute(select(User.id, User.name, User.age)).all()
+    return FastJSONResponse([user_dict(row) for row in rows])
 
 @app.get("/download/database/")
 def download_database():
     if os.path.exists(db_path):
-        return FileResponse(db_path, media_type='application/octet-stream', filename=os.path.basename(db_path))
+        try:
+            snapshot = db_snapshot.get()
+        except SnapshotTimeout as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        return FileResponse(snapshot.path, media_type='application/octet-stream', filename=os.path.basename(db_path),
+                            headers={"ETag": snapshot.etag})
     else:
         raise HTTPException(status_code=404, detail="Database file not found")
 
 @app.get("/download/csv/")
-def download_csv():
-    session = Session()
-    query = "SELECT * FROM users"
-    df = pd.read_sql(query, engine)
-    session.close()
-    
-    csv_file_path = "data.csv"
-    df.to_csv(csv_file_path, index=False)
-    
-    return FileResponse(csv_file_path, media_type='text/csv', filename='data.csv')
+def download_csv(gzip: bool = False, after_id: Optional[int] = None,
+                 range_header: Optional[str] = Header(None, alias="range"),
+                 if_range: Optional[str] = Header(None)):
+    return csv_download_response(engine, 'data.csv', gzip=gzip, after_id=after_id,
+                                 range_header=range_header, if_range=if_range)
 
 # To run the FastAPI app, use the command:
 # uvicorn hohetto_st_sqlite_deploy_01.hoheto_st_sqlite_01:app --reload
\ No newline at end of file
@@ -0,0 +1,131 @@
+import sqlite3
+
+
+class SchemaCache:
+    """Schema and table statistics for one SQLite connection, cached.
+
+    Table lists, column info and index lists are read once and reused until
+    `PRAGMA schema_version` changes. Row counts are approximate by default
+    (from sqlite_stat1 or the largest rowid); exact counts run COUNT(*) and
+    are cached until the data changes.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._schema_version = None
+        self._tables = []
+        self._types = {}
+        self._columns = {}
+        self._indexes = {}
+        self._exact_counts = {}
+        self._data_version = None
+
+    def _check_schema(self):
+        version = self.conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version != self._schema_version:
+            rows = self.conn.execute(
+                "SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY rowid"
+            ).fetchall()
+            self._types = dict(rows)
+            self._tables = [name for name, kind in rows if kind == 'table']
+            self._columns = {}
+            self._indexes = {}
+            self._exact_counts = {}
+            self._schema_version = version
+
+    def _check_data(self):
+        # data_version sees other connections' commits, total_changes our own
+        version = (self.conn.execute("PRAGMA data_version").fetchone()[0], self.conn.total_changes)
+        if version != self._data_version:
+            self._exact_counts = {}
+            self._data_version = version
+
+    def tables(self):
+        self._check_schema()
+        return list(self._tables)
+
+    def columns(self, table_name):
+        """List of (name, declared type) for the table's columns."""
+        self._check_schema()
+        if table_name not in self._columns:
+            rows = self.conn.execute(f'PRAGMA table_info("{_quote(table_name)}")').fetchall()
+            self._columns[table_name] = [(row[1], row[2]) for row in rows]
+        return self._columns[table_name]
+
+    def indexes(self, table_name):
+        """List of {'name', 'unique', 'columns'} dicts for the table's indexes."""
+        self._check_schema()
+        if table_name not in self._indexes:
+            indexes = []
+            for row in self.conn.execute(f'PRAGMA index_list("{_quote(table_name)}")').fetchall():
+                name, unique = row[1], bool(row[2])
+                columns = [info[2] for info in self.conn.execute(f'PRAGMA index_info("{_quote(name)}")')]
+                indexes.append({'name': name, 'unique': unique, 'columns': columns})
+            self._indexes[table_name] = indexes
+        return self._indexes[table_name]
+
+    def row_count(self, table_name, exact=False):
+        """Return (count, is_exact) for the table."""
+        self._check_schema()
+        if exact:
+            return self.exact_row_count(table_name), True
+
+        approx = self._stat1_row_count(table_name)
+        if approx is None and self._types.get(table_name) == 'table':
+            try:
+                approx = self.conn.execute(f'SELECT max(rowid) FROM "{_quote(table_name)}"').fetchone()[0] or 0
+            except sqlite3.Error:
+                approx = None  # WITHOUT ROWID table
+        if approx is None:
+            return self.exact_row_count(table_name), True
+        return approx, False
+
+    def exact_row_count(self, table_name):
+        self._check_schema()
+        self._check_data()
+        if table_name not in self._exact_counts:
+            count = self.conn.execute(f'SELECT COUNT(*) FROM "{_quote(table_name)}"').fetchone()[0]
+            self._exact_counts[table_name] = count
+        return self._exact_counts[table_name]
+
+    def _stat1_row_count(self, table_name):
+        # sqlite_stat1 exists only after ANALYZE; its first number is the row count
+        try:
+            row = self.conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table_name,)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or not row[0]:
+            return None
+        return int(row[0].split()[0])
+
+    def table_size(self, table_name):
+        """Return {'pages', 'bytes'} for the table and its indexes, or None without dbstat."""
+        try:
+            row = self.conn.execute(
+                "SELECT count(*), sum(pgsize) FROM dbstat WHERE name = ? OR name IN "
+                "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?)",
+                (table_name, table_name),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return {'pages': row[0], 'bytes': row[1] or 0}
+
+    def database_size(self):
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return {'pages': page_count, 'page_size': page_size, 'bytes': page_count * page_size}
+
+    def table_stats(self, table_name, exact=False):
+        count, is_exact = self.row_count(table_name, exact=exact)
+        return {
+            'table': table_name,
+            'rows': count,
+            'rows_exact': is_exact,
+            'columns': len(self.columns(table_name)),
+            'indexes': self.indexes(table_name),
+            'size': self.table_size(table_name),
+        }
+
+
+def _quote(name):
+    return name.replace('"', '""')
@@ -0,0 +1,213 @@
+import re
+import sqlite3
+import time
+
+# Rows fetched per call while timing a query
+TIMING_BATCH_SIZE = 1000
+
+_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(?: USING (COVERING )?INDEX (\w+))?')
+_FROM_RE = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_SQL_KEYWORDS = {'WHERE', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'NATURAL', 'ON', 'USING',
+                 'GROUP', 'ORDER', 'LIMIT', 'HAVING', 'WINDOW', 'UNION', 'EXCEPT', 'INTERSECT'}
+_CLAUSE_END_RE = r'(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bHAVING\b|\bWINDOW\b|$)'
+_EQUALITY_OPS = ('=', '==', 'IN', 'IS')
+
+
+class PlanNode:
+    def __init__(self, node_id, parent_id, detail):
+        self.id = node_id
+        self.parent_id = parent_id
+        self.detail = detail
+        self.children = []
+
+
+def explain(conn, query):
+    """Run EXPLAIN QUERY PLAN and return the top-level PlanNodes as a tree."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+    nodes = {}
+    roots = []
+    for row in rows:
+        node = PlanNode(row[0], row[1], row[-1])
+        nodes[node.id] = node
+        parent = nodes.get(node.parent_id)
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+    return roots
+
+
+def iter_nodes(roots, depth=0):
+    for node in roots:
+        yield node, depth
+        yield from iter_nodes(node.children, depth + 1)
+
+
+def format_plan(roots):
+    """Render the plan the way the sqlite3 shell does."""
+    lines = ["QUERY PLAN"]
+
+    def walk(children, prefix):
+        for i, node in enumerate(children):
+            last = i == len(children) - 1
+            lines.append(f"{prefix}{'`--' if last else '|--'}{node.detail}")
+            walk(node.children, prefix + ('   ' if last else '|  '))
+
+    walk(roots, "")
+    return lines
+
+
+def find_issues(roots):
+    """Return (severity, detail) pairs for full scans and temp B-trees in the plan."""
+    issues = []
+    for node, _ in iter_nodes(roots):
+        detail = node.detail
+        match = _SCAN_RE.match(detail)
+        if match and match.group(3):
+            continue  # covering index scans only read the index
+        if match and match.group(4):
+            issues.append(('info', f"Full index scan: {detail}"))
+        elif match:
+            issues.append(('warning', f"Full table scan: {detail}"))
+        elif 'USE TEMP B-TREE' in detail:
+            issues.append(('warning', f"Temporary B-tree: {detail}"))
+    return issues
+
+
+def suggest_indexes(conn, query, roots):
+    """Suggest CREATE INDEX statements for tables the plan scans in full.
+
+    Columns compared with = / IN / IS in the WHERE clause come first, then a
+    single range column, then GROUP BY or ORDER BY columns, which is the order
+    SQLite can use them in. Suggestions already covered by an existing index
+    are dropped.
+    """
+    suggestions = []
+    where = _clause(query, r'\bWHERE\b')
+    order_by = _clause(query, r'\bGROUP\s+BY\b') or _clause(query, r'\bORDER\s+BY\b')
+    aliases = _aliases(query)
+    for node, _ in iter_nodes(roots):
+        match = _SCAN_RE.match(node.detail)
+        if not match or match.group(3):
+            continue
+        # Newer SQLite versions print only the alias ("SCAN u")
+        scanned, alias = match.group(1), match.group(2)
+        table = aliases.get(scanned.lower(), scanned)
+        columns = _table_columns(conn, table)
+        if not columns:
+            continue
+        names = {table.lower(), scanned.lower()} | ({alias.lower()} if alias else set())
+        names |= {a for a, t in aliases.items() if t.lower() == table.lower()}
+
+        equality, ranges = [], []
+        for qualifier, column, op in _comparisons(where):
+            if column.lower() not in columns or (qualifier and qualifier.lower() not in names):
+                continue
+            target = equality if op.upper() in _EQUALITY_OPS else ranges
+            if columns[column.lower()] not in equality + ranges:
+                target.append(columns[column.lower()])
+        ordering = []
+        for qualifier, column in re.findall(r'(?:(\w+)\.)?(\w+)', order_by or ''):
+            if column.lower() in columns and (not qualifier or qualifier.lower() in names):
+                name = columns[column.lower()]
+                if name not in equality and name not in ordering and column.upper() not in ('ASC', 'DESC'):
+                    ordering.append(name)
+
+        index_columns = equality + ranges[:1]
+        if not ranges:
+            index_columns += ordering
+        if not index_columns or _covered(conn, table, index_columns):
+            continue
+        name = f"idx_{table}_{'_'.join(index_columns)}"
+        cols = ', '.join(f'"{c}"' for c in index_columns)
+        sql = f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({cols})'
+        if sql not in suggestions:
+            suggestions.append(sql)
+    return suggestions
+
+
+def time_query(conn, query, repeat=3):
+    """Best wall time in seconds to run `query` and fetch every row.
+
+    Each run is rolled back to a savepoint, so timing an UPDATE or DELETE
+    leaves the data as it was.
+    """
+    best = None
+    for _ in range(repeat):
+        conn.execute("SAVEPOINT time_query")
+        try:
+            start = time.perf_counter()
+            cursor = conn.execute(query)
+            while cursor.fetchmany(TIMING_BATCH_SIZE):
+                pass
+            elapsed = time.perf_counter() - start
+        finally:
+            conn.execute("ROLLBACK TO time_query")
+            conn.execute("RELEASE time_query")
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def apply_index(conn, query, index_sql, repeat=3):
+    """Time `query`, create the index, then time it again.
+
+    Returns a dict with before/after seconds and plans.
+    """
+    before_plan = format_plan(explain(conn, query))
+    before = time_query(conn, query, repeat)
+    conn.execute(index_sql)
+    conn.commit()
+    after_plan = format_plan(explain(conn, query))
+    after = time_query(conn, query, repeat)
+    return {
+        'index': index_sql,
+        'before_seconds': before,
+        'after_seconds': after,
+        'speedup': before / after if after else None,
+        'before_plan': before_plan,
+        'after_plan': after_plan,
+    }
+
+
+def _clause(query, keyword):
+    match = re.search(keyword + r'(.*?)' + _CLAUSE_END_RE, query, re.IGNORECASE | re.DOTALL)
+    return match.group(1) if match else None
+
+
+def _aliases(query):
+    # alias (or bare table name) -> table name, from the FROM and JOIN clauses
+    aliases = {}
+    for table, alias in _FROM_RE.findall(query):
+        aliases[table.lower()] = table
+        if alias and alias.upper() not in _SQL_KEYWORDS:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def _comparisons(where):
+    if not where:
+        return []
+    pattern = r'(?:(\w+)\.)?(\w+)\s*(==|=|<=|>=|<|>|\bNOT\s+IN\b|\bIN\b|\bIS\b|\bBETWEEN\b|\bLIKE\b|\bGLOB\b)'
+    results = []
+    for qualifier, column, op in re.findall(pattern, where, re.IGNORECASE):
+        if op.upper().startswith('NOT'):
+            continue
+        results.append((qualifier, column, op))
+    return results
+
+
+def _table_columns(conn, table):
+    try:
+        rows = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+    except sqlite3.Error:
+        return {}
+    return {row[1].lower(): row[1] for row in rows}
+
+
+def _covered(conn, table, columns):
+    # An existing index whose leading columns match already serves this lookup
+    for row in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+        existing = [info[2] for info in conn.execute(f'PRAGMA index_info("{row[1]}")')]
+        if [c.lower() for c in existing[:len(columns)]] == [c.lower() for c in columns]:
+            return True
+    return False
@@ -1,17 +1,32 @@
+import argparse
+import csv
+import json
 import sqlite3
+import sys
 import pandas as pd
 from tabulate import tabulate
 
+from sqlite_metadata import SchemaCache
+from sqlite_query_plan import apply_index, explain, find_issues, format_plan, suggest_indexes
+
+# Streaming output settings
+STREAM_BATCH_SIZE = 500
+STREAM_PAGE_SIZE = 50
+WIDTH_SAMPLE_SIZE = 200
+MAX_COLUMN_WIDTH = 40
+
 class SQLiteViewer:
     def __init__(self, db_path):
         self.db_path = db_path
         self.conn = None
         self.cursor = None
+        self.meta = None
 
     def connect(self):
         try:
-            self.conn = sqlite3.connect('example.db')
+            self.conn = sqlite3.connect(self.db_path)
             self.cursor = self.conn.cursor()
+            self.meta = SchemaCache(self.conn)
             print(f"Successfully connected to {self.db_path}")
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
@@ -23,18 +38,14 @@ class SQLiteViewer:
 
     def get_tables(self):
         try:
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = self.cursor.fetchall()
-            return [table[0] for table in tables]
+            return self.meta.tables()
         except sqlite3.Error as e:
             print(f"Error getting tables: {e}")
             return []
 
     def get_table_info(self, table_name):
         try:
-            self.cursor.execute(f"PRAGMA table_info({table_name});")
-            columns = self.cursor.fetchall()
-            return [(col[1], col[2]) for col in columns]
+            return self.meta.columns(table_name)
         except sqlite3.Error as e:
             print(f"Error getting table info: {e}")
             return []
@@ -45,27 +56,196 @@ class SQLiteViewer:
             df = pd.read_sql_query(f"SELECT * FROM {table_name} LIMIT {limit}", self.conn)
             print(f"\nTable: {table_name}")
             print(tabulate(df, headers='keys', tablefmt='psql', showindex=False))
-            print(f"\nTotal rows in table: {self.get_row_count(table_name)}")
+            count, exact = self.meta.row_count(table_name)
+            print(f"\nTotal rows in table: {count if exact else f'~{count} (approximate)'}")
         except sqlite3.Error as e:
             print(f"Error viewing table data: {e}")
 
-    def get_row_count(self, table_name):
+    def get_row_count(self, table_name, exact=True):
         try:
-            self.cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            return self.cursor.fetchone()[0]
+            return self.meta.row_count(table_name, exact=exact)[0]
         except sqlite3.Error as e:
             print(f"Error getting row count: {e}")
             return 0
 
+    def show_table_stats(self, table_name, exact=False):
+        try:
+            stats = self.meta.table_stats(table_name, exact=exact)
+        except sqlite3.Error as e:
+            print(f"Error getting table statistics: {e}")
+            return
+        rows = stats['rows'] if stats['rows_exact'] else f"~{stats['rows']} (approximate)"
+        print(f"\nTable: {table_name}")
+        print(f"Rows: {rows}")
+        print(f"Columns: {stats['columns']}")
+        if stats['size'] is not None:
+            print(f"Size: {stats['size']['bytes']:,} bytes in {stats['size']['pages']} pages")
+        db_size = self.meta.database_size()
+        print(f"Database: {db_size['bytes']:,} bytes in {db_size['pages']} pages of {db_size['page_size']}")
+        print("Indexes:")
+        if not stats['indexes']:
+            print("  (none)")
+        for index in stats['indexes']:
+            unique = " UNIQUE" if index['unique'] else ""
+            print(f"  {index['name']}{unique} ({', '.join(str(c) for c in index['columns'])})")
+
+    def explain_query(self, query, interactive=False):
+        try:
+            roots = explain(self.conn, query)
+        except sqlite3.Error as e:
+            print(f"Error explaining query: {e}")
+            return
+        print()
+        print("\n".join(format_plan(roots)))
+
+        issues = find_issues(roots)
+        print("\nIssues:" if issues else "\nNo full scans or temporary B-trees.")
+        for severity, detail in issues:
+            print(f"  [{severity}] {detail}")
+
+        suggestions = suggest_indexes(self.conn, query, roots)
+        if not suggestions:
+            return
+        print("\nSuggested indexes:")
+        for i, sql in enumerate(suggestions, 1):
+            print(f"  {i}. {sql};")
+        if not interactive:
+            return
+
+        choice = input("Apply suggestion number and re-time the query (Enter to skip): ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(suggestions):
+            try:
+                result = apply_index(self.conn, query, suggestions[int(choice) - 1])
+            except sqlite3.Error as e:
+                print(f"Error applying index: {e}")
+                return
+            print(f"\nBefore: {result['before_seconds'] * 1000:.2f} ms")
+            print(f"After:  {result['after_seconds'] * 1000:.2f} ms")
+            if result['speedup']:
+                print(f"Speedup: {result['speedup']:.1f}x")
+            print("\n".join(result['after_plan']))
+
     def run_query(self, query):
         try:
-            df = pd.read_sql_query(query, self.conn)
-            print(tabulate(df, headers='keys', tablefmt='psql', showindex=False))
+            self.stream_query(query, fmt='table', interactive=sys.stdin.isatty())
         except sqlite3.Error as e:
             print(f"Error executing query: {e}")
 
+    def stream_query(self, query, fmt='table', out=sys.stdout, page_size=STREAM_PAGE_SIZE, interactive=False):
+        """Print a query's results as they are fetched, without loading them all.
+
+        `fmt` is 'table', 'csv' or 'jsonl'. Tables get their column widths from
+        the first WIDTH_SAMPLE_SIZE rows and are printed `page_size` rows at a
+        time; with `interactive` the user is asked before each further page.
+        """
+        cursor = self.conn.execute(query)
+        if cursor.description is None:
+            self.conn.commit()
+            print(f"Query OK, {cursor.rowcount} rows affected", file=out)
+            return
+        headers = [col[0] for col in cursor.description]
+
+        if fmt == 'csv':
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(headers)
+            for rows in iter(lambda: cursor.fetchmany(STREAM_BATCH_SIZE), []):
+                writer.writerows(rows)
+        elif fmt == 'jsonl':
+            for rows in iter(lambda: cursor.fetchmany(STREAM_BATCH_SIZE), []):
+                for row in rows:
+                    out.write(json.dumps(dict(zip(headers, row)), default=str) + '\n')
+        elif fmt == 'table':
+            self._stream_table(cursor, headers, out, page_size, interactive)
+        else:
+            raise ValueError(f"Unknown format: {fmt}")
+
+    def _stream_table(self, cursor, headers, out, page_size, interactive):
+        sample = cursor.fetchmany(WIDTH_SAMPLE_SIZE)
+        widths = [len(str(h)) for h in headers]
+        for row in sample:
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], len(_cell(value)))
+        widths = [min(w, MAX_COLUMN_WIDTH) for w in widths]
+
+        border = '+' + '+'.join('-' * (w + 2) for w in widths) + '+'
+
+        def format_row(values):
+            cells = []
+            for value, width in zip(values, widths):
+                text = _cell(value)
+                if len(text) > width:
+                    text = text[:width - 1] + '~'
+                cells.append(f" {text:<{width}} ")
+            return '|' + '|'.join(cells) + '|'
+
+        print(border, file=out)
+        print(format_row(headers), file=out)
+        print(border, file=out)
+
+        rows = iter(sample)
+        total = 0
+        printed_in_page = 0
+        while True:
+            row = next(rows, None)
+            if row is None:
+                batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not batch:
+                    break
+                rows = iter(batch)
+                continue
+            if interactive and printed_in_page == page_size:
+                answer = input(f"-- {total} rows shown, Enter for more, q to stop -- ")
+                if answer.strip().lower() == 'q':
+                    print(border, file=out)
+                    return
+                printed_in_page = 0
+            print(format_row(row), file=out)
+            total += 1
+            printed_in_page += 1
+        print(border, file=out)
+        print(f"{total} rows", file=out)
+
+def _cell(value):
+    return 'NULL' if value is None else str(value).replace('\n', ' ')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="View an SQLite database")
+    parser.add_argument('--db', help="path to the SQLite database")
+    parser.add_argument('--query', help="run this query, print the results and exit")
+    parser.add_argument('--format', choices=['table', 'csv', 'jsonl'], default='table',
+                        help="output format for --query (default: table)")
+    parser.add_argument('--page-size', type=int, default=STREAM_PAGE_SIZE,
+                        help="rows per page when paging table output")
+    parser.add_argument('--explain', action='store_true',
+                        help="with --query, print the query plan and index suggestions instead")
+    return parser.parse_args(argv)
+
 def main():
-    db_path = input("Enter the path to your SQLite database: ")
+    args = parse_args()
+
+    # Non-interactive mode for pipelines: stream the results to stdout
+    if args.query:
+        if not args.db:
+            print("--db is required with --query", file=sys.stderr)
+            sys.exit(2)
+        conn = sqlite3.connect(args.db)
+        viewer = SQLiteViewer(args.db)
+        viewer.conn = conn
+        try:
+            if args.explain:
+                viewer.explain_query(args.query)
+            else:
+                viewer.stream_query(args.query, fmt=args.format, page_size=args.page_size)
+        except sqlite3.Error as e:
+            print(f"Error executing query: {e}", file=sys.stderr)
+            sys.exit(1)
+        except BrokenPipeError:
+            pass
+        finally:
+            conn.close()
+        return
+
+    db_path = args.db or input("Enter the path to your SQLite database: ")
     viewer = SQLiteViewer(db_path)
     viewer.connect()
 
@@ -75,9 +255,11 @@ def main():
         print("2. View table structure")
         print("3. View table data")
         print("4. Run custom query")
-        print("5. Exit")
+        print("5. Table statistics")
+        print("6. Explain query")
+        print("7. Exit")
 
-        choice = input("\nEnter your choice (1-5): ")
+        choice = input("\nEnter your choice (1-7): ")
 
         if choice == '1':
             tables = viewer.get_tables()
@@ -113,6 +295,20 @@ def main():
             viewer.run_query(query)
 
         elif choice == '5':
+            tables = viewer.get_tables()
+            print("\nAvailable tables:")
+            for i, table in enumerate(tables, 1):
+                print(f"{i}. {table}")
+            table_idx = int(input("Enter table number: ")) - 1
+            if 0 <= table_idx < len(tables):
+                exact = input("Count rows exactly? (y/N): ").strip().lower() == 'y'
+                viewer.show_table_stats(tables[table_idx], exact)
+
+        elif choice == '6':
+            query = input("Enter your SQL query: ")
+            viewer.explain_query(query, interactive=True)
+
+        elif choice == '7':
             viewer.close()
             break
 
@@ -1,7 +1,165 @@
+import queue
 import sqlite3
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
+
+from sqlite_metadata import SchemaCache
+from sqlite_query_plan import apply_index, explain, find_issues, suggest_indexes
+
+# Height of one Treeview row in pixels, used to work out how many rows fit
+ROW_HEIGHT = 20
+# Rows scrolled per mouse wheel notch
+WHEEL_ROWS = 3
+# Background query settings
+QUERY_BATCH_SIZE = 500
+QUERY_POLL_MS = 50
+QUERY_BATCHES_PER_POLL = 4
+# Batches the worker may get ahead of the grid before it waits
+QUERY_QUEUE_BATCHES = 8
+# Most result rows put in the grid; the rest of a bigger result is not fetched
+QUERY_MAX_ROWS = 10000
+
+
+class RowWindow:
+    """The slice of a table currently shown in the grid.
+
+    Only `size` rows are held at a time. Tables with a rowid are paged by
+    keyset on rowid (and dragging the scrollbar seeks by rowid), everything
+    else falls back to LIMIT/OFFSET. The pages either side of the window are
+    prefetched so scrolling by a page does not wait on the database.
+    """
+
+    def __init__(self, conn, table_name, size, meta=None):
+        self.conn = conn
+        self.table = table_name.replace('"', '""')
+        self.size = max(1, size)
+        self.rows = []
+        self.offset = 0
+        self._prefetched = {}
+
+        cursor = self.conn.cursor()
+        # Views and WITHOUT ROWID tables have no usable rowid
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (table_name,))
+        found = cursor.fetchone()
+        self.keyset = found is not None and found[0] == 'table'
+        if self.keyset:
+            try:
+                cursor.execute(f'SELECT rowid, * FROM "{self.table}" LIMIT 0')
+            except sqlite3.Error:
+                self.keyset = False
+        if not self.keyset:
+            cursor.execute(f'SELECT * FROM "{self.table}" LIMIT 0')
+        description = cursor.description[1:] if self.keyset else cursor.description
+        self.columns = [col[0] for col in description]
+
+        if self.keyset:
+            cursor.execute(f'SELECT min(rowid), max(rowid) FROM "{self.table}"')
+            self.min_rowid, self.max_rowid = cursor.fetchone()
+            self.total = None
+        elif meta is not None:
+            self.total = meta.exact_row_count(table_name)
+        else:
+            cursor.execute(f'SELECT COUNT(*) FROM "{self.table}"')
+            self.total = cursor.fetchone()[0]
+
+    # Fetching
+
+    def _fetch_after(self, rowid, count, inclusive=False):
+        key = ('after', rowid, inclusive)
+        rows = self._prefetched.get(key)
+        if rows is not None and len(rows) >= count:
+            return rows[:count]
+        op = '>=' if inclusive else '>'
+        cursor = self.conn.execute(
+            f'SELECT rowid, * FROM "{self.table}" WHERE rowid {op} ? ORDER BY rowid LIMIT ?', (rowid, count))
+        return cursor.fetchall()
+
+    def _fetch_before(self, rowid, count):
+        key = ('before', rowid, False)
+        rows = self._prefetched.get(key)
+        if rows is not None and len(rows) >= count:
+            return rows[-count:]
+        cursor = self.conn.execute(
+            f'SELECT rowid, * FROM "{self.table}" WHERE rowid < ? ORDER BY rowid DESC LIMIT ?', (rowid, count))
+        return cursor.fetchall()[::-1]
+
+    def _fetch_offset(self, offset, count):
+        cursor = self.conn.execute(f'SELECT * FROM "{self.table}" LIMIT ? OFFSET ?', (count, offset))
+        return cursor.fetchall()
+
+    def prefetch(self):
+        # Fill the cache with the pages just before and after the window
+        if not self.keyset or not self.rows:
+            return
+        first, last = self.rows[0][0], self.rows[-1][0]
+        self._prefetched = {
+            ('after', last, False): self._fetch_after(last, self.size),
+            ('before', first, False): self._fetch_before(first, self.size),
+        }
+
+    # Moving the window
+
+    def resize(self, size):
+        self.size = max(1, size)
+        if self.keyset:
+            start = self.rows[0][0] if self.rows else self.min_rowid
+            self.rows = self._fetch_after(start, self.size, inclusive=True) if start is not None else []
+            if len(self.rows) < self.size:
+                self.moveto(1.0)
+        else:
+            self.rows = self._fetch_offset(self.offset, self.size)
+
+    def scroll(self, delta):
+        if not delta:
+            return
+        if not self.keyset:
+            max_offset = max(0, self.total - self.size)
+            self.offset = min(max(0, self.offset + delta), max_offset)
+            self.rows = self._fetch_offset(self.offset, self.size)
+            return
+        if not self.rows:
+            return
+        if delta > 0:
+            extra = self._fetch_after(self.rows[-1][0], delta)
+            combined = self.rows + extra
+            self.rows = combined[-self.size:] if len(extra) < delta else combined[delta:delta + self.size]
+        else:
+            extra = self._fetch_before(self.rows[0][0], -delta)
+            self.rows = (extra + self.rows)[:self.size]
+
+    def moveto(self, fraction):
+        fraction = min(max(fraction, 0.0), 1.0)
+        if not self.keyset:
+            max_offset = max(0, self.total - self.size)
+            self.offset = int(round(fraction * max_offset))
+            self.rows = self._fetch_offset(self.offset, self.size)
+            return
+        if self.min_rowid is None:
+            self.rows = []
+            return
+        target = self.min_rowid + int(fraction * (self.max_rowid - self.min_rowid))
+        rows = self._fetch_after(target, self.size, inclusive=True)
+        if len(rows) < self.size:
+            rows = self._fetch_before(self.max_rowid + 1, self.size)
+        self.rows = rows
+
+    def fractions(self):
+        """Scrollbar (first, last) position of the window."""
+        if not self.rows:
+            return 0.0, 1.0
+        if not self.keyset:
+            total = max(self.total, 1)
+            return self.offset / total, min(1.0, (self.offset + len(self.rows)) / total)
+        span = self.max_rowid - self.min_rowid + 1
+        first = (self.rows[0][0] - self.min_rowid) / span
+        last = (self.rows[-1][0] - self.min_rowid + 1) / span
+        return first, last
+
+    def values(self):
+        return [row[1:] if self.keyset else row for row in self.rows]
+
 
 class SQLiteViewerGUI:
     def __init__(self, root):
@@ -10,7 +168,18 @@ class SQLiteViewerGUI:
         self.root.geometry("800x600")
         
         self.conn = None
+        self.meta = None
+        self.db_path = None
         self.current_table = None
+        self.window = None
+
+        # State of the query running in the background, if any
+        self.query_thread = None
+        self.query_conn = None
+        self.query_results = None
+        self.query_cancelled = False
+        self.query_rows = 0
+        self.query_start = 0.0
         
         self.setup_gui()
 
@@ -30,6 +199,8 @@ class SQLiteViewerGUI:
         self.table_combo = ttk.Combobox(table_frame, state='disabled')
         self.table_combo.pack(side='left', padx=5)
         self.table_combo.bind('<<ComboboxSelected>>', self.on_table_select)
+        self.table_stats_label = ttk.Label(table_frame, text="")
+        self.table_stats_label.pack(side='left', padx=5)
 
         # Query frame
         query_frame = ttk.LabelFrame(self.root, text="Custom Query", padding=5)
@@ -37,20 +208,40 @@ class SQLiteViewerGUI:
 
         self.query_entry = ttk.Entry(query_frame)
         self.query_entry.pack(side='left', fill='x', expand=True, padx=5)
-        ttk.Button(query_frame, text="Run Query", command=self.run_query).pack(side='left', padx=5)
+        self.run_button = ttk.Button(query_frame, text="Run Query", command=self.run_query)
+        self.run_button.pack(side='left', padx=5)
+        self.cancel_button = ttk.Button(query_frame, text="Cancel", command=self.cancel_query, state='disabled')
+        self.cancel_button.pack(side='left', padx=5)
+        ttk.Button(query_frame, text="Explain", command=self.explain_query).pack(side='left', padx=5)
+
+        # Query progress and timing
+        status_frame = ttk.Frame(self.root, padding=5)
+        status_frame.pack(fill='x', padx=5)
+        self.progress = ttk.Progressbar(status_frame, mode='indeterminate', length=120)
+        self.progress.pack(side='left', padx=5)
+        self.status_label = ttk.Label(status_frame, text="")
+        self.status_label.pack(side='left', padx=5)
 
         # Results frame
         results_frame = ttk.LabelFrame(self.root, text="Results", padding=5)
         results_frame.pack(fill='both', expand=True, padx=5, pady=5)
 
         # Treeview for displaying results
+        ttk.Style().configure('Treeview', rowheight=ROW_HEIGHT)
         self.tree = ttk.Treeview(results_frame)
         self.tree.pack(fill='both', expand=True, side='left')
 
-        # Scrollbar for treeview
-        scrollbar = ttk.Scrollbar(results_frame, orient='vertical', command=self.tree.yview)
-        scrollbar.pack(side='right', fill='y')
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Scrollbar for treeview; drives the row window when a table is open
+        self.scrollbar = ttk.Scrollbar(results_frame, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
+
+        self.tree.bind('<Configure>', self.on_tree_resize)
+        self.tree.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_window(-WHEEL_ROWS))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_window(WHEEL_ROWS))
+        self.tree.bind('<Next>', lambda e: self.scroll_window(self.window.size if self.window else 0))
+        self.tree.bind('<Prior>', lambda e: self.scroll_window(-self.window.size if self.window else 0))
 
     def open_database(self):
         file_path = filedialog.askopenfilename(filetypes=[("SQLite Database", "*.db"), ("All Files", "*.*")])
@@ -59,6 +250,8 @@ class SQLiteViewerGUI:
                 if self.conn:
                     self.conn.close()
                 self.conn = sqlite3.connect(file_path)
+                self.meta = SchemaCache(self.conn)
+                self.db_path = file_path
                 self.connection_label.config(text=f"Connected: {file_path}")
                 self.load_tables()
                 self.table_combo.config(state='readonly')
@@ -66,9 +259,7 @@ class SQLiteViewerGUI:
                 messagebox.showerror("Error", f"Error opening database: {e}")
 
     def load_tables(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = [table[0] for table in cursor.fetchall()]
+        tables = self.meta.tables()
         self.table_combo['values'] = tables
         if tables:
             self.table_combo.set(tables[0])
@@ -78,41 +269,282 @@ class SQLiteViewerGUI:
         table = self.table_combo.get()
         if table:
             self.current_table = table
+            self.show_table_stats(table)
             self.display_table_data(table)
 
+    def show_table_stats(self, table_name):
+        try:
+            stats = self.meta.table_stats(table_name)
+        except sqlite3.Error as e:
+            self.table_stats_label.config(text=f"Stats unavailable: {e}")
+            return
+        rows = f"{stats['rows']:,}" if stats['rows_exact'] else f"~{stats['rows']:,}"
+        text = f"{rows} rows, {stats['columns']} columns, {len(stats['indexes'])} indexes"
+        if stats['size'] is not None:
+            text += f", {stats['size']['bytes'] / 1024:,.0f} KiB"
+        self.table_stats_label.config(text=text)
+
     def display_table_data(self, table_name):
         try:
-            df = pd.read_sql_query(f"SELECT * FROM {table_name}", self.conn)
-            self.display_dataframe(df)
+            self.window = RowWindow(self.conn, table_name, self.visible_rows(), self.meta)
+            self.setup_columns(self.window.columns)
+            self.window.resize(self.window.size)
+            self.render_window()
         except sqlite3.Error as e:
+            self.window = None
             messagebox.showerror("Error", f"Error displaying table: {e}")
 
+    def visible_rows(self):
+        # Rows that fit below the heading row
+        height = self.tree.winfo_height()
+        return max(1, (height - ROW_HEIGHT) // ROW_HEIGHT) if height > 1 else 25
+
+    def setup_columns(self, columns):
+        self.tree.delete(*self.tree.get_children())
+        self.tree['columns'] = list(columns)
+        self.tree['show'] = 'headings'
+        for column in columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=100)  # Adjust width as needed
+
+    def render_window(self):
+        self.tree.delete(*self.tree.get_children())
+        for values in self.window.values():
+            self.tree.insert("", 'end', values=values)
+        self.scrollbar.set(*self.window.fractions())
+        # Load the neighbouring pages once the window is on screen
+        self.root.after_idle(self.prefetch_window)
+
+    def prefetch_window(self):
+        if self.window is not None:
+            try:
+                self.window.prefetch()
+            except sqlite3.Error:
+                pass
+
+    def scroll_window(self, delta):
+        if self.window is not None and delta:
+            self.window.scroll(delta)
+            self.render_window()
+
+    def on_scrollbar(self, *args):
+        if self.window is None:
+            self.tree.yview(*args)
+        elif args[0] == 'moveto':
+            self.window.moveto(float(args[1]))
+            self.render_window()
+        elif args[0] == 'scroll':
+            step = self.window.size if args[2] == 'pages' else 1
+            self.scroll_window(int(args[1]) * step)
+
+    def on_tree_scroll(self, first, last):
+        # The Treeview's own scroll position only matters for query results
+        if self.window is None:
+            self.scrollbar.set(first, last)
+
+    def on_tree_resize(self, event):
+        if self.window is not None:
+            size = self.visible_rows()
+            if size != self.window.size:
+                self.window.resize(size)
+                self.render_window()
+
+    def on_mouse_wheel(self, event):
+        if self.window is not None:
+            self.scroll_window(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS)
+            return 'break'
+
     def run_query(self):
         query = self.query_entry.get()
-        if query:
+        if not query or self.query_thread is not None:
+            return
+        if self.db_path is None:
+            messagebox.showerror("Error", "Open a database first")
+            return
+
+        self.window = None
+        self.setup_columns([])
+        self.query_results = queue.Queue(maxsize=QUERY_QUEUE_BATCHES)
+        self.query_cancelled = False
+        self.query_truncated = False
+        self.query_rows = 0
+        self.query_start = time.perf_counter()
+        self.query_thread = threading.Thread(target=self.query_worker, args=(query, self.query_results), daemon=True)
+        self.query_thread.start()
+
+        self.run_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.progress.start(10)
+        self.status_label.config(text="Running...")
+        self.root.after(QUERY_POLL_MS, self.poll_query)
+
+    def query_worker(self, query, results):
+        # Runs on its own thread with its own connection; results go back through the queue
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            self.query_conn = conn
+            if self.query_cancelled:
+                raise sqlite3.OperationalError("interrupted")
+            cursor = conn.execute(query)
+            results.put(('columns', [col[0] for col in cursor.description or []]))
+            fetched = 0
+            while True:
+                # put() blocks while the grid is behind, so memory stays bounded
+                if self.query_cancelled:
+                    raise sqlite3.OperationalError("interrupted")
+                rows = cursor.fetchmany(min(QUERY_BATCH_SIZE, QUERY_MAX_ROWS - fetched))
+                if not rows:
+                    break
+                fetched += len(rows)
+                results.put(('rows', rows))
+                if fetched == QUERY_MAX_ROWS:
+                    if cursor.fetchone() is not None:
+                        results.put(('truncated', None))
+                    break
+            conn.commit()
+            results.put(('done', None))
+        except sqlite3.Error as e:
+            results.put(('error', e))
+        finally:
+            self.query_conn = None
+            if conn is not None:
+                conn.close()
+
+    def cancel_query(self):
+        self.query_cancelled = True
+        conn = self.query_conn
+        if conn is not None:
+            conn.interrupt()
+        self.status_label.config(text="Cancelling...")
+
+    def poll_query(self):
+        # Insert a few batches per tick so the window stays responsive
+        for _ in range(QUERY_BATCHES_PER_POLL):
             try:
-                df = pd.read_sql_query(query, self.conn)
-                self.display_dataframe(df)
-            except sqlite3.Error as e:
-                messagebox.showerror("Error", f"Error executing query: {e}")
+                kind, payload = self.query_results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'columns':
+                self.setup_columns(payload)
+            elif kind == 'rows':
+                for row in payload:
+                    self.tree.insert("", 'end', values=row)
+                self.query_rows += len(payload)
+            elif kind == 'truncated':
+                self.query_truncated = True
+            else:
+                self.finish_query(payload if kind == 'error' else None)
+                return
+        self.update_query_status("Running")
+        self.root.after(QUERY_POLL_MS, self.poll_query)
 
-    def display_dataframe(self, df):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def finish_query(self, error):
+        self.query_thread = None
+        self.progress.stop()
+        self.run_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+        if error is not None and self.query_cancelled:
+            self.update_query_status("Cancelled")
+        elif error is not None:
+            self.update_query_status("Failed")
+            messagebox.showerror("Error", f"Error executing query: {error}")
+        elif self.query_truncated:
+            self.update_query_status("Done (more rows not shown)")
+        else:
+            self.update_query_status("Done")
 
-        # Configure columns
-        self.tree['columns'] = list(df.columns)
-        self.tree['show'] = 'headings'
+    def update_query_status(self, state):
+        elapsed = time.perf_counter() - self.query_start
+        rate = self.query_rows / elapsed if elapsed > 0 else 0
+        self.status_label.config(text=f"{state}: {self.query_rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
 
-        # Set column headings
-        for column in df.columns:
-            self.tree.heading(column, text=column)
-            self.tree.column(column, width=100)  # Adjust width as needed
+    def explain_query(self):
+        query = self.query_entry.get()
+        if not query or self.conn is None:
+            return
+        try:
+            roots = explain(self.conn, query)
+            issues = find_issues(roots)
+            suggestions = suggest_indexes(self.conn, query, roots)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Error explaining query: {e}")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Query Plan")
+        dialog.geometry("700x450")
+
+        plan_tree = ttk.Treeview(dialog, show='tree')
+        plan_tree.pack(fill='both', expand=True, padx=5, pady=5)
+
+        def add_nodes(parent, nodes):
+            for node in nodes:
+                item = plan_tree.insert(parent, 'end', text=node.detail, open=True)
+                add_nodes(item, node.children)
+
+        add_nodes("", roots)
+
+        issues_text = "\n".join(f"[{severity}] {detail}" for severity, detail in issues)
+        ttk.Label(dialog, text=issues_text or "No full scans or temporary B-trees.", justify='left').pack(
+            fill='x', padx=5)
 
-        # Add data
-        for i, row in df.iterrows():
-            self.tree.insert("", 'end', values=list(row))
+        if not suggestions:
+            return
+        ttk.Label(dialog, text="Suggested indexes:").pack(anchor='w', padx=5)
+        suggestion_list = tk.Listbox(dialog, height=min(len(suggestions), 5))
+        for sql in suggestions:
+            suggestion_list.insert('end', sql)
+        suggestion_list.selection_set(0)
+        suggestion_list.pack(fill='x', padx=5)
+
+        result_label = ttk.Label(dialog, text="")
+        apply_button = ttk.Button(dialog, text="Apply and Re-time")
+
+        def on_apply():
+            selection = suggestion_list.curselection()
+            if not selection:
+                return
+            index_sql = suggestions[selection[0]]
+            apply_button.config(state='disabled')
+            result_label.config(text="Timing query before and after...")
+            results = queue.Queue()
+            threading.Thread(target=self.apply_index_worker, args=(query, index_sql, results), daemon=True).start()
+            self.root.after(QUERY_POLL_MS, poll, results)
+
+        def poll(results):
+            try:
+                kind, payload = results.get_nowait()
+            except queue.Empty:
+                self.root.after(QUERY_POLL_MS, poll, results)
+                return
+            apply_button.config(state='normal')
+            if kind == 'error':
+                result_label.config(text=f"Error applying index: {payload}")
+                return
+            text = (f"Before: {payload['before_seconds'] * 1000:.2f} ms, "
+                    f"after: {payload['after_seconds'] * 1000:.2f} ms")
+            if payload['speedup']:
+                text += f" ({payload['speedup']:.1f}x)"
+            result_label.config(text=text + "\n" + "\n".join(payload['after_plan']))
+            if self.current_table:
+                self.show_table_stats(self.current_table)
+
+        apply_button.config(command=on_apply)
+        apply_button.pack(anchor='w', padx=5, pady=5)
+        result_label.pack(fill='x', padx=5, pady=5)
+
+    def apply_index_worker(self, query, index_sql, results):
+        # Index builds and timing runs can be slow, so they get their own connection and thread
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            results.put(('done', apply_index(conn, query, index_sql)))
+        except sqlite3.Error as e:
+            results.put(('error', e))
+        finally:
+            if conn is not None:
+                conn.close()
 
 def main():
     root = tk.Tk()
@@ -1,2 +1,16 @@
 #!/bin/bash
-uvicorn api.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+# SQLite connection profile, read by api/db.py
+export SQLITE_JOURNAL_MODE="${SQLITE_JOURNAL_MODE:-WAL}"
+export SQLITE_SYNCHRONOUS="${SQLITE_SYNCHRONOUS:-NORMAL}"
+export SQLITE_BUSY_TIMEOUT_MS="${SQLITE_BUSY_TIMEOUT_MS:-5000}"
+export SQLITE_MMAP_SIZE="${SQLITE_MMAP_SIZE:-268435456}"
+export SQLITE_CACHE_SIZE="${SQLITE_CACHE_SIZE:--64000}"
+export SQLITE_TEMP_STORE="${SQLITE_TEMP_STORE:-MEMORY}"
+export SQLITE_POOL_SIZE="${SQLITE_POOL_SIZE:-5}"
+export SQLITE_MAX_OVERFLOW="${SQLITE_MAX_OVERFLOW:-10}"
+
+# Worker processes; reads use mode=ro connections and writes share a file lock,
+# so this can go up to the number of CPU cores
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-1}"
+
+uvicorn api.main:app --host 0.0.0.0 --port 8000 --workers "$WEB_CONCURRENCY"
@@ -0,0 +1,30 @@
+import sqlite3
+
+from sqlite_query_plan import apply_index, explain, suggest_indexes, time_query
+
+
+def make_conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (a INTEGER, b INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, 0) for i in range(10)])
+    conn.commit()
+    return conn
+
+
+def test_time_query_leaves_dml_unchanged():
+    conn = make_conn()
+    time_query(conn, "UPDATE t SET b = b + 1 WHERE a = 3")
+    time_query(conn, "DELETE FROM t WHERE a > 5")
+    assert conn.execute("SELECT b FROM t WHERE a = 3").fetchone() == (0,)
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (10,)
+
+
+def test_apply_index_on_update_keeps_data_and_creates_index():
+    conn = make_conn()
+    query = "UPDATE t SET b = b + 1 WHERE a = 3"
+    suggestions = suggest_indexes(conn, query, explain(conn, query))
+    assert suggestions == ['CREATE INDEX IF NOT EXISTS "idx_t_a" ON "t" ("a")']
+
+    apply_index(conn, query, suggestions[0])
+    assert conn.execute("SELECT b FROM t WHERE a = 3").fetchone() == (0,)
+    assert [row[1] for row in conn.execute("PRAGMA index_list(t)")] == ['idx_t_a']